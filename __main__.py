@@ -1,22 +1,129 @@
 """Initialize and start pygame."""
-import pygame
-import pygame.gfxdraw
+import argparse
+import os
 import random
 import time
 import signal
+import sys
+import threading
+
+from config import is_override, parse_overrides
+
+
+def positive_int(value):
+    """Parse a command line integer of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1: " + value)
+    return number
+
+
+def parse_args():
+    """Parse command line arguments.
+
+    NAME=value arguments override settings for this run. They are applied
+    first, before the game modules copying the settings are imported."""
+    parser = argparse.ArgumentParser(description="Robo Showdown",
+                                     epilog="NAME=value arguments override settings.py for this run, "
+                                            "values are Python literals, e.g. POPULATION_SIZE=12")
+    argv = sys.argv[1:]
+    try:
+        config = parse_overrides([arg for arg in argv if is_override(arg)])
+    except ValueError as e:
+        parser.error(str(e))
+    export, islands, metrics, replay = config.apply("export", "islands", "metrics", "replay")
+
+    parser.add_argument("--headless", action="store_true", default=config.HEADLESS,
+                        help="run without a window or FPS limit, timing in simulated ticks")
+    parser.add_argument("--spectate", action="store_true",
+                        help="simulate headless at full speed on a thread, showing snapshots in a window")
+    parser.add_argument("--spectate-every", type=positive_int, default=config.SPECTATE_EVERY, metavar="N",
+                        help="only show every Nth generation when spectating")
+    parser.add_argument("--workers", type=int, default=config.EVALUATION_WORKERS,
+                        help="worker processes evaluating each generation headless (0 for none)")
+    parser.add_argument("--arenas", type=positive_int, default=config.NUM_ARENAS,
+                        help="number of arenas the population is split into for evaluation")
+    parser.add_argument("--trials", type=positive_int, default=config.NUM_TRIALS,
+                        help="trials per arena with different random seeds, hits/damage are summed")
+    parser.add_argument("--arenas-per-batch", type=positive_int, default=config.ARENAS_PER_BATCH,
+                        help="arenas stepped together in one vectorized world")
+    parser.add_argument("--profile", action="store_true", default=config.PROFILE,
+                        help="time the phases of every generation and print them after its fitness")
+    parser.add_argument("--islands", type=int, default=config.NUM_ISLANDS,
+                        help="evolve this many sub-populations in separate processes, always headless "
+                             "(0 for one population)")
+    parser.add_argument("--migration-interval", type=int, default=config.MIGRATION_INTERVAL, metavar="M",
+                        help="generations between migrations of the elite between islands (0 for never)")
+    parser.add_argument("--topology", choices=islands.TOPOLOGIES, default=config.MIGRATION_TOPOLOGY,
+                        help="islands the elite of an island migrates to")
+    parser.add_argument("--metrics", choices=list(metrics.SINKS) + ["none"], default=config.METRICS_FORMAT,
+                        help="format of the per-generation metrics written to " + config.METRICS_DIR)
+    parser.add_argument("--checkpoint-interval", type=int, default=config.CHECKPOINT_INTERVAL, metavar="N",
+                        help="write a checkpoint to " + config.CHECKPOINT_FILE +
+                             " every N generations (0 for never)")
+    parser.add_argument("--resume", metavar="FILE", nargs="?", const=config.CHECKPOINT_FILE,
+                        help="continue the run saved in a checkpoint (default: " + config.CHECKPOINT_FILE + ")")
+    parser.add_argument("--record", metavar="FILE", default=config.REPLAY_FILE,
+                        help="append a replay of every simulated generation to FILE")
+    parser.add_argument("--export", type=int, nargs="+", metavar="GENERATION", default=[],
+                        help="render these generations offscreen into " + config.EXPORT_DIR)
+    parser.add_argument("--export-format", choices=list(export.WRITERS), default=config.EXPORT_FORMAT,
+                        help="format of exported generations")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="play back generations recorded in FILE instead of training")
+    parser.add_argument("--generations", type=int, nargs="+",
+                        help="generations to play back (default: all)")
+    parser.add_argument("--step", action="store_true",
+                        help="advance the replay one tick per key press")
+    args = parser.parse_args([arg for arg in argv if not is_override(arg)])
+
+    if args.replay:
+        try:
+            recorded = replay.ReplayFile(args.replay).offsets
+        except (OSError, ValueError) as e:
+            parser.error("cannot read replay file: " + str(e))
+        missing = [generation for generation in args.generations or [] if generation not in recorded]
+        if missing:
+            parser.error("generations not recorded in " + args.replay + ": " + " ".join(map(str, missing)))
+    if (args.record or args.export) and (args.workers > 0 or args.arenas > 1 or args.trials > 1):
+        parser.error("--record and --export only work when simulating in the main process")
+    if args.islands > 0 and (args.record or args.export or args.resume or args.workers > 0 or args.profile):
+        parser.error("--islands cannot be combined with --record, --export, --resume, --workers or --profile")
+    if args.spectate and (args.islands > 0 or args.workers > 0 or args.arenas > 1 or args.trials > 1):
+        parser.error("--spectate only works when simulating in the main process")
+    return args
+
+
+# settings overrides are applied before the game modules are imported
+args = parse_args()
+
 import numpy as np
-import tensorflow as tf
+import pygame
+import pygame.gfxdraw
+
+from concurrent.futures import ProcessPoolExecutor
 
-from bullet import Bullet
+from checkpoint import CheckpointWriter, load_checkpoint
+from evaluation import evaluate_population, run_generation
+from export import Exporter
+from metrics import MetricsWriter
+from model_store import save_model
+from profiler import Profiler
+from quantization import dequantize
 from fighter import Fighter, Vision
+from renderer import Renderer
+from replay import ReplayRecorder, play as play_replay
+from spectator import Snapshot, SnapshotBuffer, spectate
+from world import World
 from colors import *
 from settings import *
 from gene_functions import *
+from islands import run_islands
 
 
 def init_pygame():
     """Initialize pygame."""
-    global screen, clock, bullet_sprites, default_font
+    global screen, clock, renderer
     # initialize pygame and create window
     pygame.init()
     pygame.mixer.init()  # for sound
@@ -26,104 +133,69 @@ def init_pygame():
     pygame.display.set_caption("Genetic Fighting")
     clock = pygame.time.Clock()  # for syncing the FPS
 
-    # group all the sprites together for ease of update
-    bullet_sprites = pygame.sprite.Group()
-
     default_font = pygame.font.SysFont("arial bold", 28)
+    renderer = Renderer(screen, default_font)
 
 
-def reset_environment(new_fighters):
+def reset_environment(new_fighters, headless=False):
     """Reset the environment after each trial."""
-    global population, bullet_sprites
+    global population, fighters, world, Q
 
     population = new_fighters
+    fighters = list(population.values())
+    Q = dequantize(np.stack([fighter.Q for fighter in fighters]))  # for batched action selection
 
-    bullet_sprites.empty()
+    reload_time = RELOAD_TICKS if headless else TIME_TO_RELOAD
+    world = World.from_fighters(fighters, reload_time=reload_time)
 
 
-##################################################################
-#                         START THE GAME                         #
-##################################################################
+def episode_running(tick, start_time, headless):
+    """Return true while the current episode has time left."""
+    if headless:
+        return tick < EPISODE_TICKS
+    return time.perf_counter() - start_time < EPISODE_LENGTH
 
-default_font = None
 
-population = {}
-next_population = get_random_population()
+def simulate_generation(generation, headless):
+    """Simulate the current population in the main process, drawing it unless headless."""
+    colors = [fighter.color for fighter in fighters]
+    exporting = exporter is not None and exporter.wants(generation)
+    recording = recorder is not None and (recorder.path is not None or exporting)
+    if recording:
+        recorder.begin(generation, world, colors)
+    publishing = snapshots is not None and generation % args.spectate_every == 0
 
-init_pygame()
-
-
-tf_best_score = tf.Variable(0)
-tf.summary.scalar('best_score_per_generation', tf_best_score)
-summary_op = tf.summary.merge_all()
-
-sess = tf.Session()
-sess.run(tf.global_variables_initializer())
-writer = tf.summary.FileWriter('graphs/'+time.strftime("session-%Y%m%d-%H%M%S"), sess.graph)
-
-for generation in range(NUM_GENERATIONS):
-    reset_environment(next_population)
-
-    label_str = "Generation: " + str(generation)
-    generation_label = default_font.render(label_str, 1, BLACK)
-    print(label_str, end="")
-
-    start_time = time.clock()
-
-    # start simulation of current generation
     running = True
-    while running and time.clock() - start_time < EPISODE_LENGTH:
-
-        clock.tick(FPS)  # ensure loop runs at constant speed
-        clock_time = pygame.time.get_ticks()
-
-        # get all the events which have occurred until now
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == SHOOT_EVENT:
-                bullet = Bullet(event.shooter, event.x, event.y, event.angle, BULLET_SPEED)
-                bullet_sprites.add(bullet)
+    start_time = time.perf_counter()
+    tick = 0
 
-        # detect states of each fighter
-
-        for fighter in population.values():
-
-            if fighter.reloading and (clock_time - fighter.last_shot_time) > TIME_TO_RELOAD:
-                fighter.reloading = False
+    # start simulation of current generation
+    while running and episode_running(tick, start_time, headless):
 
-            fighter.on_target = False
-            fighter.fighter_on_left = False
-            fighter.fighter_on_right = False
+        if headless:
+            clock_time = tick  # reload is measured in frames
+        else:
+            clock.tick(FPS)  # ensure loop runs at constant speed
+            clock_time = pygame.time.get_ticks()
+        tick += 1
 
-            for other_fighter in population.values():
-                if fighter != other_fighter:
-                    fighter.on_target |= fighter.vision.on_target(other_fighter.torso)
-                    result = fighter.vision.detects(other_fighter.torso)
-                    if result == "left":
-                        fighter.fighter_on_left = True
-                    elif result == "right":
-                        fighter.fighter_on_right = True
+        profiler.count("ticks")
+        profiler.count("bullets", world.num_bullets)
 
-            fighter.bullet_on_left = False
-            fighter.bullet_on_right = False
+        if not headless:
+            # get all the events which have occurred until now
+            with profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
 
-            for bullet in bullet_sprites:
-                if bullet.shooter != fighter.id:
-                    result = fighter.vision.detects(bullet)
-                    if result == "left":
-                        fighter.bullet_on_left = True
-                    elif result == "right":
-                        fighter.bullet_on_right = True
+        # detect states of each fighter
+        with profiler.phase("sense"):
+            world.sense(clock_time)
 
         # detect bullet collision
-        for fighter_id, fighter in population.items():
-            for bullet in bullet_sprites:
-                if bullet.shooter is not fighter_id and \
-                        pygame.sprite.collide_circle(bullet, fighter.torso):
-                    population[bullet.shooter].hits += 1
-                    fighter.damage += 1
-                    bullet.kill()
+        with profiler.phase("collide"):
+            world.collide()
 
         # keyboard events for user controlled input
         # pressed = pygame.key.get_pressed()
@@ -138,39 +210,154 @@ for generation in range(NUM_GENERATIONS):
         #     user_action[3] = 1
 
         # execute actions for each fighter
-        for fighter in population.values():
-            action_weights = fighter.Q[fighter.state, :]
-            # if fighter.id != 0:  # uncomment to control fighter 0 with keyboard
-            fighter.update(actions=get_probable_action(action_weights))
-        # fighters[0].update(actions=user_action)  # uncomment to control fighter 0 with keyboard
+        with profiler.phase("actions"):
+            actions = get_probable_actions(Q, world.state)
+        # actions[0] = user_action  # uncomment to control fighter 0 with keyboard
+        with profiler.phase("step"):
+            world.step(actions, clock_time)
+
+        if recording:
+            with profiler.phase("record"):
+                recorder.record(world, actions)
+
+        if publishing:
+            with profiler.phase("publish"):
+                snapshots.publish(Snapshot(generation, tick, world, colors))
+
+        if not headless:
+            # draw to screen
+            with profiler.phase("draw"):
+                renderer.draw(world)
+
+    world.store_results(fighters)
+    profiler.count("pairs_tested", world.pairs_tested)
+
+    if recording:
+        chunk = recorder.end()
+        if exporting:
+            exporter.submit(generation, chunk)
 
-        bullet_sprites.update()
 
-        # draw to screen
-        screen.fill(WHITE)
-        screen.blit(generation_label, (10, 10))
+def simulate_population(population, generation):
+    """Simulate a generation in separate headless arenas, or in the main arena."""
+    if parallel:
+        with profiler.phase("evaluate"):
+            evaluate_population(population, executor, args.arenas, args.trials, args.arenas_per_batch)
+    else:
+        simulate_generation(generation, args.headless)
 
-        for fighter in population.values():
-            for sprite in fighter:
-                sprite.draw(screen)
-        bullet_sprites.draw(screen)
 
-        pygame.display.update()
+def train(start_generation, next_population, history):
+    """Evolve the population from start_generation, until NUM_GENERATIONS or stop_training is set."""
+    for generation in range(start_generation, NUM_GENERATIONS):
+        if stop_training.is_set():
+            break
 
-    # generation trial complete, store weights of best fighter
-    best_fighter = max(population.values(), key=lambda f: fitness(f))
-    best_fitness = fitness(best_fighter)
-    best_weights = best_fighter.Q
-    np.savetxt(MODEL_FILE, best_weights, delimiter=",")
-    print(", best fitness:", best_fitness)
+        reset_environment(next_population, args.headless)
 
-    # create new population from previous population
-    next_population = breed_population(population)
+        label_str = "Generation: " + str(generation)
+        if not args.headless:
+            renderer.reset(fighters, label_str)
+        print(label_str, end="")
+        profiler.reset()
 
-    # update tensorflow data for visualization
-    sess.run(tf_best_score.assign(best_fitness))
+        # simulate, then create new population from previous population
+        stats, best_fighter, next_population = run_generation(population, simulate_population,
+                                                              generation=generation)
 
-    summary = sess.run(summary_op)
-    writer.add_summary(summary, generation)
+        # generation trial complete, store weights of best fighter
+        best_weights = best_fighter.Q
+        save_model(best_weights)
+        if profiler.enabled:
+            print(", best fitness:", stats["best_fitness"], "|", profiler.format())
+        else:
+            print(", best fitness:", stats["best_fitness"])
+
+        # log generation stats for visualization
+        history.append(dict(generation=generation, **stats))
+        metrics.write(generation, **stats)
+
+        if checkpoints is not None and (generation + 1) % args.checkpoint_interval == 0:
+            checkpoints.save(generation + 1, next_population, history)
+
+
+##################################################################
+#                         START THE GAME                         #
+##################################################################
+
+if SEED is not None:
+    seed_generators(SEED)  # same starting positions, fighters, evaluations and breeding every run
+
+if args.replay:
+    init_pygame()
+    play_replay(args.replay, screen, renderer, args.generations, args.step)
+    pygame.quit()
+    sys.exit()
+
+if args.islands > 0:
+    metrics = MetricsWriter.create(args.metrics,
+                                   os.path.join(METRICS_DIR, time.strftime("session-%Y%m%d-%H%M%S")))
+    best_fitness = None
+    for island, generation, stats, best_weights in run_islands(args.islands, NUM_GENERATIONS,
+                                                               args.migration_interval, args.topology,
+                                                               num_arenas=args.arenas, num_trials=args.trials,
+                                                               arenas_per_batch=args.arenas_per_batch):
+        print("Island " + str(island) + ", generation: " + str(generation) + ", best fitness:",
+              stats["best_fitness"])
+        metrics.write(generation, **stats)
+
+        # store weights of the best fighter of any island so far
+        if best_fitness is None or stats["best_fitness"] >= best_fitness:
+            best_fitness = stats["best_fitness"]
+            save_model(best_weights)
+    metrics.close()
+    sys.exit()
+
+# generations are exported from the replay chunks recorded of them
+exporter = Exporter(args.export, export_format=args.export_format) if args.export else None
+recorder = ReplayRecorder(args.record) if args.record or exporter is not None else None
+profiler = Profiler(args.profile)
+snapshots = None  # SnapshotBuffer simulated generations are published to when spectating
+stop_training = threading.Event()
+
+population = {}
+if args.resume:
+    start_generation, next_population, history = load_checkpoint(args.resume)
+    print("Resuming at generation", start_generation, "from", args.resume)
+else:
+    start_generation, next_population, history = 0, get_random_population(), []
+checkpoints = CheckpointWriter() if args.checkpoint_interval > 0 else None
+
+# simulate generations in separate headless arenas instead of the main arena
+parallel = args.workers > 0 or args.arenas > 1 or args.trials > 1
+if parallel or args.spectate:
+    args.headless = True
+executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 0 else None
+
+if not args.headless:
+    init_pygame()
+
+metrics = MetricsWriter.create(args.metrics, os.path.join(METRICS_DIR, time.strftime("session-%Y%m%d-%H%M%S")))
+
+if args.spectate:
+    # simulate flat out on a thread, the window shows snapshots at its own frame rate
+    init_pygame()
+    snapshots = SnapshotBuffer()
+    training = threading.Thread(target=train, args=(start_generation, next_population, history),
+                                name="training", daemon=True)
+    training.start()
+    if not spectate(snapshots, training, renderer):
+        stop_training.set()  # window closed, finish the current generation
+    training.join()
+else:
+    train(start_generation, next_population, history)
+
+metrics.close()
+if checkpoints is not None:
+    checkpoints.close()
+if exporter is not None:
+    exporter.close()
+if executor is not None:
+    executor.shutdown()
 
 pygame.quit()
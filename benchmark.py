@@ -0,0 +1,184 @@
+"""Benchmarks of simulation, sensing, breeding and rendering throughput.
+
+Run with `python benchmark.py`, every result is printed as one JSON line
+(and appended to --output) so runs of different versions can be compared.
+
+The game modules are imported by the benchmarks using them, so the breed
+benchmarks can apply their settings in fresh processes before importing
+them (see RunConfig.apply)."""
+import argparse
+import json
+import multiprocessing
+import platform
+import time
+import numpy as np
+import pygame
+
+from settings import *
+from config import RunConfig
+
+
+def measure(func, min_time=0.2, min_calls=3):
+    """Return the mean wall time in seconds of calling func, calling it for at least min_time."""
+    func()  # warm up
+    calls = 0
+    start = time.perf_counter()
+    while calls < min_calls or time.perf_counter() - start < min_time:
+        func()
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def random_world(num_fighters, num_bullets=0, num_arenas=1, seed=0):
+    """Create a world with fighters and bullets at random positions."""
+    from world import World
+
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(FIGHTER_RADIUS, [WIDTH - FIGHTER_RADIUS, HEIGHT - FIGHTER_RADIUS], (num_fighters, 2))
+    world = World(centers, rng.uniform(0, 360, num_fighters), reload_time=RELOAD_TICKS, num_arenas=num_arenas)
+
+    angles = np.radians(rng.uniform(0, 360, num_bullets))
+    world.add_bullets(rng.uniform(0, WIDTH, num_bullets), rng.uniform(0, HEIGHT, num_bullets),
+                      np.sin(angles) * BULLET_SPEED, -np.cos(angles) * BULLET_SPEED,
+                      rng.integers(0, num_fighters, num_bullets))
+    return world, rng
+
+
+def bench_step(num_fighters, num_arenas=1, min_time=0.2):
+    """Ticks per second of a full sense/collide/step tick with random actions."""
+    world, rng = random_world(num_fighters * num_arenas, num_arenas=num_arenas)
+    tick = [0]
+
+    def run_tick():
+        world.sense(tick[0])
+        world.collide()
+        world.step(rng.random((world.num_fighters, NUM_ACTIONS)) < 0.5, tick[0])
+        tick[0] += 1
+
+    seconds = measure(run_tick, min_time)
+    return dict(fighters=num_fighters, arenas=num_arenas, seconds_per_tick=seconds, ticks_per_second=1 / seconds)
+
+
+def bench_sense(num_fighters, num_bullets, min_time=0.2):
+    """Cost of sensing for fighter and bullet counts."""
+    world, _ = random_world(num_fighters, num_bullets)
+    seconds = measure(lambda: world.sense(0), min_time)
+    return dict(fighters=num_fighters, bullets=num_bullets, seconds_per_call=seconds)
+
+
+def bench_breed_Q(population_size, num_states, min_time=0.2):
+    """Time to breed the Q-tables of the children of a population (all but the elite)."""
+    from gene_functions import breed_Q
+
+    rng = np.random.default_rng(0)
+    num_children = max(population_size - NUM_ELITE, 1)
+    Q1 = rng.random((num_children, num_states, NUM_ACTIONS))
+    Q2 = rng.random((num_children, num_states, NUM_ACTIONS))
+    seconds = measure(lambda: breed_Q(Q1, Q2, rng), min_time)
+    return dict(population=population_size, states=num_states, seconds_per_generation=seconds)
+
+
+def bench_breed(overrides, min_time=0.2):
+    """Time breed_population takes for a population of random fighters, with settings overridden.
+
+    Includes selection and the creation of the children. Must run in a fresh
+    process, see RunConfig.apply."""
+    config = RunConfig(**overrides)
+    gene_functions, = config.apply("gene_functions")
+
+    rng = np.random.default_rng(0)
+    population = {i: gene_functions.create_random_fighter(i, Q=rng.random((config.NUM_STATES, NUM_ACTIONS)))
+                  for i in range(config.POPULATION_SIZE)}
+
+    def breed():
+        for fighter in population.values():
+            fighter.hits = int(rng.integers(0, 10))  # results of a simulated generation
+        gene_functions.breed_population(population)
+
+    seconds = measure(breed, min_time)
+    return dict(population=config.POPULATION_SIZE, states=config.NUM_STATES, seconds_per_generation=seconds)
+
+
+def bench_render(num_fighters, num_bullets, display, min_time=0.2):
+    """Frame render time, drawing to the display or to an offscreen surface."""
+    from renderer import Renderer, fighter_views
+
+    world, rng = random_world(num_fighters, num_bullets)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT)) if display else pygame.Surface((WIDTH, HEIGHT))
+    renderer = Renderer(screen, pygame.font.Font(None, 28), update_display=display)
+
+    renderer.reset(fighter_views([(0, 0, 255)] * num_fighters, world.x, world.y, world.angle), "Benchmark")
+
+    def draw_frame():
+        # move everything like a simulation step would, without simulating
+        world.x = np.clip(world.x + rng.normal(0, 1, num_fighters), FIGHTER_RADIUS, WIDTH - FIGHTER_RADIUS)
+        world.angle = (world.angle + rng.normal(0, 4, num_fighters)) % 360
+        bullets = world.bullets
+        bullets.move()
+        bullets.x %= WIDTH
+        bullets.y %= HEIGHT
+        renderer.draw(world)
+
+    seconds = measure(draw_frame, min_time)
+    return dict(fighters=num_fighters, bullets=num_bullets, display=display, seconds_per_frame=seconds)
+
+
+def run(quick=False, display=True):
+    """Run all benchmarks, yielding (benchmark name, result) pairs."""
+    fighter_counts = [6, 24] if quick else [6, 24, 96, 384]
+    min_time = 0.05 if quick else 0.5
+
+    for n in fighter_counts:
+        yield "step", bench_step(n, min_time=min_time)
+    for arenas in ([1, 8] if quick else [1, 8, 32, 128]):
+        yield "step", bench_step(POPULATION_SIZE, arenas, min_time=min_time)
+
+    for n in fighter_counts:
+        for bullets in ([0, 32] if quick else [0, 32, 128, 512]):
+            yield "sense", bench_sense(n, bullets, min_time=min_time)
+
+    for population_size in ([6, 24] if quick else [6, 24, 96]):
+        for num_states in ([256, NUM_STATES] if quick else [256, NUM_STATES, 4 * NUM_STATES]):
+            yield "breed_Q", bench_breed_Q(population_size, num_states, min_time=min_time)
+
+    # every configuration in a new process, the settings are applied before the game modules are imported
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for population_size in ([6, 24] if quick else [6, 24, 96]):
+            for num_observations in ([4, NUM_OBSERVATIONS] if quick else [4, NUM_OBSERVATIONS, 7]):
+                overrides = dict(POPULATION_SIZE=population_size, NUM_OBSERVATIONS=num_observations)
+                yield "breed", pool.apply(bench_breed, (overrides, min_time))
+
+    pygame.font.init()
+    for shown in ([False, True] if display else [False]):
+        for n in fighter_counts[:3]:
+            yield "render", bench_render(n, 4 * n, shown, min_time=min_time)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Robo Showdown benchmarks")
+    parser.add_argument("--quick", action="store_true", help="run fewer and shorter sweeps")
+    parser.add_argument("--no-display", action="store_true", help="skip benchmarks needing a display")
+    parser.add_argument("--output", metavar="FILE", help="append results as JSON lines to FILE")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.no_display:
+        pygame.display.init()
+
+    environment = dict(time=time.strftime("%Y-%m-%dT%H:%M:%S"), python=platform.python_version(),
+                       numpy=np.__version__, pygame=pygame.version.ver, machine=platform.machine())
+    output = open(args.output, "a") if args.output else None
+
+    for name, result in run(args.quick, not args.no_display):
+        line = json.dumps(dict(benchmark=name, **result, **environment))
+        print(line)
+        if output:
+            output.write(line + "\n")
+            output.flush()
+
+    if output:
+        output.close()
+    pygame.quit()
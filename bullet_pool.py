@@ -0,0 +1,104 @@
+"""Preallocated storage of bullets, recycling the slots of removed bullets."""
+import copy
+import numpy as np
+
+
+class BulletPool:
+    """Bullets stored in fixed slots of preallocated arrays.
+
+    Every bullet keeps its slot until it is released, freed slots are
+    pushed onto a free list and reused by the next spawns, so shooting
+    and removing bullets never reallocates the arrays. Arrays hold every slot, only
+    the ones marked alive are bullets, dead slots keep stale values."""
+
+    def __init__(self, capacity):
+        """Initialize an empty pool with room for capacity bullets."""
+        self.capacity = 0
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.dx = np.empty(0)
+        self.dy = np.empty(0)
+        self.shooter = np.empty(0, dtype=int)
+        self.alive = np.empty(0, dtype=bool)
+
+        # stack of free slots, the top is free[num_free - 1]
+        self.free = np.empty(0, dtype=int)
+        self.num_free = 0
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.capacity - self.num_free
+
+    def grow(self, capacity):
+        """Enlarge the pool to capacity slots, keeping every bullet in its slot."""
+        old = self.capacity
+        if capacity <= old:
+            return
+
+        def resized(values, fill):
+            new = np.full(capacity, fill, dtype=values.dtype)
+            new[:old] = values
+            return new
+
+        self.x = resized(self.x, 0.0)
+        self.y = resized(self.y, 0.0)
+        self.dx = resized(self.dx, 0.0)
+        self.dy = resized(self.dy, 0.0)
+        self.shooter = resized(self.shooter, 0)
+        self.alive = resized(self.alive, False)
+
+        # new slots go below the current free ones, lowest slot on top
+        free = np.empty(capacity, dtype=int)
+        free[:capacity - old] = np.arange(capacity - 1, old - 1, -1)
+        free[capacity - old:capacity - old + self.num_free] = self.free[:self.num_free]
+        self.free = free
+        self.num_free += capacity - old
+        self.capacity = capacity
+
+    def spawn(self, x, y, dx, dy, shooter):
+        """Store bullets at centers x, y moving by dx, dy per step, return their slots.
+
+        The pool doubles in size if it runs out of free slots, so bullets
+        are never dropped."""
+        n = len(x)
+        if n > self.num_free:
+            self.grow(max(2 * self.capacity, len(self) + n))
+
+        slots = self.free[self.num_free - n:self.num_free][::-1].copy()
+        self.num_free -= n
+
+        self.x[slots] = x
+        self.y[slots] = y
+        self.dx[slots] = dx
+        self.dy[slots] = dy
+        self.shooter[slots] = shooter
+        self.alive[slots] = True
+        return slots
+
+    def release(self, slots):
+        """Remove the bullets in slots (which must be alive) and free their slots."""
+        n = len(slots)
+        self.alive[slots] = False
+        self.free[self.num_free:self.num_free + n] = slots
+        self.num_free += n
+
+    def release_where(self, mask):
+        """Remove every alive bullet selected by a per-slot mask."""
+        self.release(np.flatnonzero(mask & self.alive))
+
+    def clear(self):
+        """Remove every bullet."""
+        self.release(self.live())
+
+    def copy(self):
+        """Return an independent copy of the pool."""
+        return copy.deepcopy(self)
+
+    def live(self):
+        """Return the slots of all alive bullets, in slot order."""
+        return np.flatnonzero(self.alive)
+
+    def move(self):
+        """Move every bullet one step."""
+        np.add(self.x, self.dx, out=self.x, where=self.alive)
+        np.add(self.y, self.dy, out=self.y, where=self.alive)
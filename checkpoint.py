@@ -0,0 +1,131 @@
+"""Checkpoints of the whole genetic algorithm state, written from a background thread."""
+import json
+import os
+import queue
+import random
+import threading
+import numpy as np
+
+from settings import *
+from fighter import Fighter
+from gene_functions import breeding_rng
+from sparse_q import SparseQ
+
+
+def snapshot(generation, population, history):
+    """Capture everything needed to continue at generation as a dict of arrays.
+
+    population is the (bred) population that will be simulated at generation,
+    history the per-generation stats so far. Arrays are copies and the random
+    generator states are taken now, so the snapshot can be saved later."""
+    fighters = list(population.values())
+    sparse = [isinstance(f.Q, SparseQ) for f in fighters]
+    dense_Q = [f.Q for f, is_sparse in zip(fighters, sparse) if not is_sparse]
+    sparse_Q = [f.Q for f, is_sparse in zip(fighters, sparse) if is_sparse]
+    dtype = fighters[0].Q.dtype
+    np_state = np.random.get_state()
+    py_version, py_state, py_gauss = random.getstate()
+
+    meta = dict(generation=generation,
+                history=history,
+                breeding_rng=breeding_rng.bit_generator.state,
+                numpy_random=[np_state[0], np_state[2], np_state[3], np_state[4]],
+                python_random=[py_version, py_gauss])
+    return dict(meta=np.array(json.dumps(meta)),
+                ids=np.array([f.id for f in fighters]),
+                Q=np.array(dense_Q, dtype=dtype).reshape(-1, NUM_STATES, NUM_ACTIONS),  # dense tables only
+                visits=np.stack([f.visits for f in fighters]),
+                # sparse tables as their explicit rows, concatenated, and default rows
+                sparse=np.array(sparse),
+                sparse_counts=np.array([len(Q.rows) for Q in sparse_Q], dtype=np.int64),
+                sparse_rows=np.concatenate([Q.rows for Q in sparse_Q] + [np.empty(0, dtype=np.int64)]),
+                sparse_values=np.concatenate([Q.values for Q in sparse_Q] + [np.empty((0, NUM_ACTIONS), dtype)]),
+                sparse_default=np.array([Q.default for Q in sparse_Q], dtype=dtype).reshape(-1, NUM_ACTIONS),
+                colors=np.array([f.color for f in fighters], dtype=np.uint8),
+                positions=np.array([(f.x, f.y) for f in fighters]),
+                angles=np.array([f.angle for f in fighters], dtype=float),
+                numpy_random_key=np_state[1].copy(),
+                python_random_state=np.array(py_state, dtype=np.uint64))
+
+
+def write_checkpoint(arrays, path=CHECKPOINT_FILE):
+    """Write a snapshot to an .npz file, replacing it atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """Load a checkpoint and restore the random generator states it was taken with.
+
+    Returns (generation, population, history) to continue the run from."""
+    with np.load(path) as arrays:
+        meta = json.loads(str(arrays["meta"]))
+
+        dense_Q = iter(arrays["Q"])
+        sparse_Q = iter([])
+        sparse = np.zeros(len(arrays["ids"]), dtype=bool)
+        if "sparse_counts" in arrays:  # older checkpoints hold dense tables only
+            sparse = arrays["sparse"]
+            splits = np.cumsum(arrays["sparse_counts"])[:-1]
+            sparse_Q = zip(np.split(arrays["sparse_rows"], splits), np.split(arrays["sparse_values"], splits),
+                           arrays["sparse_default"])
+
+        population = {}
+        for i, id in enumerate(arrays["ids"].tolist()):
+            x, y = arrays["positions"][i].tolist()
+            Q = SparseQ(*next(sparse_Q)) if sparse[i] else next(dense_Q)
+            population[id] = Fighter(id=id, color=tuple(arrays["colors"][i].tolist()), radius=FIGHTER_RADIUS,
+                                     x=x, y=y, angle=float(arrays["angles"][i]), Q=Q)
+            if "visits" in arrays:
+                population[id].visits[:] = arrays["visits"][i]
+
+        # restored last, creating fighters must not advance the generators
+        breeding_rng.bit_generator.state = meta["breeding_rng"]
+        algorithm, pos, has_gauss, cached_gaussian = meta["numpy_random"]
+        np.random.set_state((algorithm, arrays["numpy_random_key"], pos, has_gauss, cached_gaussian))
+        py_version, py_gauss = meta["python_random"]
+        random.setstate((py_version, tuple(arrays["python_random_state"].tolist()), py_gauss))
+
+    return meta["generation"], population, meta["history"]
+
+
+class CheckpointWriter:
+    """Save checkpoints on a background thread.
+
+    save() only takes a snapshot, serializing and writing happen on the
+    thread. If a checkpoint is still waiting to be written when the next
+    one is saved, the older one is skipped."""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        """Initialize a writer saving checkpoints to path."""
+        self.path = path
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            arrays = self.queue.get()
+            if arrays is None:
+                break
+            write_checkpoint(arrays, self.path)
+
+    def save(self, generation, population, history):
+        """Queue a checkpoint to continue at generation with population (see snapshot)."""
+        arrays = snapshot(generation, population, history)
+        try:
+            self.queue.put_nowait(arrays)
+        except queue.Full:
+            try:
+                self.queue.get_nowait()  # superseded by the new checkpoint
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(arrays)
+
+    def close(self):
+        """Write the queued checkpoint and stop the thread."""
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,78 @@
+"""Run configurations: the values of settings.py, with some of them overridden for a run."""
+import ast
+import importlib
+import settings
+
+
+# settings computed from other settings, in order of dependency
+DERIVED_SETTINGS = {
+    "RELOAD_TICKS": lambda s: s.TIME_TO_RELOAD * s.FPS // 1000,
+    "SIGHT_RANGE": lambda s: max(s.WIDTH, s.HEIGHT) * 0.2,
+    "SPATIAL_GRID_CELL_SIZE": lambda s: s.SIGHT_RANGE + s.FIGHTER_RADIUS + 1,
+    "NUM_STATES": lambda s: (2**s.NUM_OBSERVATIONS)**2,
+    "EPISODE_TICKS": lambda s: s.EPISODE_LENGTH * s.FPS,
+}
+
+
+class RunConfig:
+    """Settings of one run: settings.py with overrides, e.g. RunConfig(POPULATION_SIZE=24).
+
+    Settings are read as attributes (config.POPULATION_SIZE). Settings derived
+    from an overridden one (see DERIVED_SETTINGS) follow it unless they are
+    overridden themselves."""
+
+    def __init__(self, **overrides):
+        """Initialize a configuration overriding settings by name."""
+        for name in overrides:
+            if not name.isupper() or not hasattr(settings, name):
+                raise ValueError("unknown setting " + repr(name))
+        self.overrides = overrides
+
+        self.values = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+        self.values.update(overrides)
+        for name, derive in DERIVED_SETTINGS.items():
+            if name not in overrides:
+                self.values[name] = derive(self)
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["values"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return "RunConfig(" + ", ".join("%s=%r" % item for item in self.overrides.items()) + ")"
+
+    def apply(self, *modules):
+        """Replace the values of the settings module with the ones of this configuration,
+        then import the named modules and return them.
+
+        Modules copy the settings with `from settings import *` when they are
+        first imported, so this has to be called before importing any of them,
+        e.g. first thing in a fresh worker process, and the modules using the
+        settings are imported through it, e.g.
+        `evaluation, = RunConfig(POPULATION_SIZE=24).apply("evaluation")`."""
+        for name, value in self.values.items():
+            setattr(settings, name, value)
+        return [importlib.import_module(module) for module in modules]
+
+
+def is_override(arg):
+    """Return True if a command line argument is a NAME=value settings override."""
+    name, sep, _ = arg.partition("=")
+    return bool(sep) and name.isupper() and name.isidentifier()
+
+
+def parse_overrides(specs):
+    """Parse NAME=value settings overrides into a RunConfig.
+
+    Values are Python literals, e.g. POPULATION_SIZE=12 or METRICS_FORMAT='csv'.
+    Raises ValueError for unknown settings and invalid values."""
+    overrides = {}
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        try:
+            overrides[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            raise ValueError("value of " + name + " is not a Python literal: " + repr(value)) from None
+    return RunConfig(**overrides)
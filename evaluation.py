@@ -0,0 +1,124 @@
+"""Headless evaluation of a population in independent arenas, optionally in parallel."""
+import time
+import numpy as np
+
+from settings import *
+from gene_functions import breed_population, fitness, get_probable_actions
+from quantization import dequantize
+from world import World
+
+
+def run_episode(world, Q, rng=np.random, ticks=EPISODE_TICKS):
+    """Simulate a headless episode of ticks frames.
+
+    Q holds the stacked Q-tables of every fighter in the world."""
+    for tick in range(ticks):
+        world.sense(tick)
+        world.collide()
+        world.step(get_probable_actions(Q, world.state, rng), tick)
+
+
+def simulate_arenas(Q, seed, ticks=EPISODE_TICKS):
+    """Simulate a batch of arenas in one world, return the hits, damage and state visits of their fighters.
+
+    Q holds the Q-table of every fighter of every arena, dense or SparseQ, as
+    an (arenas, fighters per arena, NUM_STATES, NUM_ACTIONS) array or nested
+    lists. Hits and damage have shape (arenas, fighters per arena), visits
+    are (fighter, state, count) arrays of the states visited, with fighters
+    numbered arena by arena. Start positions, angles and actions are drawn
+    from a generator seeded with seed, so the result only depends on the
+    arguments."""
+    rng = np.random.default_rng(seed)
+    # sent to workers in the compact Q_DTYPE, sparse tables as their visited rows
+    Q = dequantize(np.array([[np.asarray(q) for q in arena_Q] for arena_Q in Q]))
+    num_arenas, fighters_per_arena = Q.shape[:2]
+    num_fighters = num_arenas * fighters_per_arena
+
+    # same distribution as get_random_fighter_pos, as torso centers
+    corners = rng.integers(0, [WIDTH - 2*FIGHTER_RADIUS, HEIGHT - 2*FIGHTER_RADIUS],
+                           size=(num_fighters, 2), endpoint=True)
+    angles = rng.integers(0, 359, size=num_fighters, endpoint=True)
+
+    world = World(corners + FIGHTER_RADIUS, angles, reload_time=RELOAD_TICKS, num_arenas=num_arenas)
+    run_episode(world, Q.reshape(num_fighters, *Q.shape[2:]), rng, ticks)
+
+    visitors, states = np.nonzero(world.visits)
+    visits = visitors, states, world.visits[visitors, states]
+    return world.per_arena(world.hits), world.per_arena(world.damage), visits
+
+
+def split_arenas(num_fighters, num_arenas):
+    """Split fighter indices into num_arenas arenas of nearly equal size."""
+    return [arena for arena in np.array_split(np.arange(num_fighters), num_arenas) if len(arena)]
+
+
+def batch_arenas(arenas, arenas_per_batch):
+    """Group arenas of the same size into batches of at most arenas_per_batch."""
+    batches = []
+    for size in sorted(set(len(arena) for arena in arenas)):
+        same_size = [arena for arena in arenas if len(arena) == size]
+        for i in range(0, len(same_size), arenas_per_batch):
+            batches.append(same_size[i:i + arenas_per_batch])
+    return batches
+
+
+def evaluate_population(population, executor=None, num_arenas=NUM_ARENAS, num_trials=NUM_TRIALS,
+                        arenas_per_batch=ARENAS_PER_BATCH, seed=None, ticks=EPISODE_TICKS):
+    """Evaluate a population in separate arenas and store the hits/damage of its fighters.
+
+    Every arena is simulated num_trials times with different random positions
+    and the hits/damage of all trials are summed. Up to arenas_per_batch
+    arenas are stepped together in one World. Batches are simulated in the
+    worker processes of executor (e.g. a ProcessPoolExecutor), or in this
+    process without one."""
+    fighters = list(population.values())
+    if seed is None:
+        seed = np.random.randint(2**31)  # follows the global numpy seed
+
+    batches = batch_arenas(split_arenas(len(fighters), num_arenas) * num_trials, arenas_per_batch)
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    Qs = [[[fighters[i].Q for i in arena] for arena in batch] for batch in batches]
+
+    map_batches = executor.map if executor is not None else map
+    results = map_batches(simulate_arenas, Qs, seeds, [ticks] * len(batches))
+
+    hits = np.zeros(len(fighters), dtype=int)
+    damage = np.zeros(len(fighters), dtype=int)
+    visits = np.zeros((len(fighters), NUM_STATES), dtype=np.int64)
+    for batch, (batch_hits, batch_damage, (visitors, states, counts)) in zip(batches, results):
+        for arena, arena_hits, arena_damage in zip(batch, batch_hits, batch_damage):
+            hits[arena] += arena_hits
+            damage[arena] += arena_damage
+        np.add.at(visits, (np.concatenate(batch)[visitors], states), counts)
+
+    for i, fighter in enumerate(fighters):
+        fighter.hits = int(hits[i])
+        fighter.damage = int(damage[i])
+        fighter.visits += visits[i]
+
+
+def generation_stats(population):
+    """Summarize the fitness of an evaluated population and the states its fighters visited."""
+    fighters = list(population.values())
+    fitnesses = [fitness(f) for f in fighters]
+    return dict(best_fitness=max(fitnesses),
+                mean_fitness=float(np.mean(fitnesses)),
+                hits=sum(f.hits for f in fighters),
+                damage=sum(f.damage for f in fighters),
+                visited_states=int(np.count_nonzero(sum(f.visits for f in fighters))))
+
+
+def run_generation(population, simulate=evaluate_population, **kwargs):
+    """Simulate a population, summarize it and breed the next one from it.
+
+    simulate(population, **kwargs) stores the hits/damage of every fighter,
+    evaluate_population by default. Returns (stats, best fighter, next
+    population), the elite of the next population are the NUM_ELITE best
+    fighters, best first."""
+    start_time = time.perf_counter()
+    simulate(population, **kwargs)
+
+    best_fighter = max(population.values(), key=lambda f: fitness(f))
+    stats = generation_stats(population)
+    stats["generation_time"] = time.perf_counter() - start_time
+    return stats, best_fighter, breed_population(population)
@@ -0,0 +1,116 @@
+"""Offscreen export of simulated generations as image sequences or GIFs, in a worker process."""
+import multiprocessing
+import os
+import numpy as np
+import pygame
+
+from settings import *
+from renderer import Renderer, fighter_views
+from replay import ReplayChunk
+
+
+class PngSequenceWriter:
+    """Write every frame as a numbered PNG image into a directory."""
+
+    extension = ""  # path is a directory
+
+    def __init__(self, path, fps):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.num_frames = 0
+
+    def write(self, surface):
+        pygame.image.save(surface, os.path.join(self.path, "frame-%05d.png" % self.num_frames))
+        self.num_frames += 1
+
+    def close(self):
+        pass
+
+
+class GifWriter:
+    """Append every frame to an animated GIF as soon as it is written."""
+
+    extension = ".gif"
+
+    def __init__(self, path, fps):
+        import imageio  # only imported when this format is chosen
+        if tuple(int(part) for part in imageio.__version__.split(".")[:2]) < (2, 28):
+            raise ImportError("gif export needs imageio 2.28 or newer, older versions take durations in seconds")
+        self.writer = imageio.v2.get_writer(path, mode="I", duration=1000 / fps, loop=0)  # milliseconds
+
+    def write(self, surface):
+        self.writer.append_data(pygame.surfarray.array3d(surface).swapaxes(0, 1))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    "png": PngSequenceWriter,
+    "gif": GifWriter,
+}
+
+
+def export_chunk(chunk, writer, font, frame_step=EXPORT_FRAME_STEP):
+    """Render every frame_step-th tick of a recorded generation offscreen and write it.
+
+    Only one frame is held in memory at a time."""
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    renderer = Renderer(surface, font, update_display=False)
+
+    start = chunk.fighters[0]
+    renderer.reset(fighter_views(chunk.colors.tolist(), start["x"], start["y"], start["angle"]),
+                   "Generation: " + str(chunk.generation))
+    for tick, world in enumerate(chunk.worlds()):
+        if tick % frame_step == 0:
+            renderer.draw(world)
+            writer.write(surface)
+    writer.close()
+
+
+def run_exporter(jobs, export_format, frame_step):
+    """Export (path, chunk bytes) jobs until None is received, the target of the exporter process."""
+    pygame.font.init()
+    font = pygame.font.SysFont("arial bold", 28)
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        path, data = job
+        chunk = ReplayChunk(np.frombuffer(data, dtype=np.uint8), 0)
+        export_chunk(chunk, WRITERS[export_format](path, FPS / frame_step), font, frame_step)
+
+
+class Exporter:
+    """Export chosen generations from a worker process, so training never waits for rendering.
+
+    Generations are handed over as compact replay chunks (see ReplayRecorder),
+    frames are rendered and written one at a time by the worker."""
+
+    def __init__(self, generations, export_dir=EXPORT_DIR, export_format=EXPORT_FORMAT,
+                 frame_step=EXPORT_FRAME_STEP):
+        """Initialize an exporter of generations into export_dir in a format of WRITERS."""
+        self.generations = set(generations)
+        self.export_dir = export_dir
+        self.extension = WRITERS[export_format].extension
+        os.makedirs(export_dir, exist_ok=True)
+
+        self.jobs = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=run_exporter, name="exporter", daemon=True,
+                                               args=(self.jobs, export_format, frame_step))
+        self.process.start()
+
+    def wants(self, generation):
+        """Return True if generation is to be exported."""
+        return generation in self.generations
+
+    def submit(self, generation, data):
+        """Queue the replay chunk bytes of a generation for export, returns immediately."""
+        path = os.path.join(self.export_dir, "generation-%d%s" % (generation, self.extension))
+        self.jobs.put((path, data))
+
+    def close(self):
+        """Wait until every queued generation is exported and stop the worker."""
+        self.jobs.put(None)
+        self.process.join()
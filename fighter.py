@@ -8,11 +8,14 @@ import numpy as np
 from colors import *
 from settings import *
 from geometry import *
+from images import circle_image
+from model_store import load_model
+from quantization import quantize
 from vision import Vision
 from pygame import Color
 
 
-class SmoothCircle(pygame.sprite.Sprite):
+class SmoothCircle(pygame.sprite.DirtySprite):
     def __init__(self, color, radius, x, y, bg_color=WHITE):
         """Initialize a smooth circle."""
         super().__init__()
@@ -21,7 +24,6 @@ class SmoothCircle(pygame.sprite.Sprite):
         self.color = color
         self.radius = radius
 
-        self.image = pygame.Surface([self.radius*2, self.radius*2])
         self.update_image()
 
         self.rect = self.image.get_rect()
@@ -29,67 +31,87 @@ class SmoothCircle(pygame.sprite.Sprite):
 
     def set_position(self, x, y):
         """Set the position of the circle."""
-        self.rect.x = x
-        self.rect.y = y
+        if (x, y) != self.rect.topleft:
+            self.rect.x = x
+            self.rect.y = y
+            self.dirty = 1
 
     def update_image(self):
         """Update the image of the circle."""
-        self.image.fill(self.bg_color)
-        self.image.set_colorkey(self.bg_color)
+        self.image = circle_image(self.color, self.radius, self.bg_color)
+        self.dirty = 1
 
-        cx = cy = self.radius  # center point of circle
-
-        # radius-1 otherwise circle is cut off around the edges
-        pygame.gfxdraw.aacircle(self.image, cx, cy, self.radius-1, self.color)
-        pygame.gfxdraw.filled_circle(self.image, cx, cy, self.radius-1, self.color)
+    def set_color(self, color):
+        """Set the color of the circle, only re-rendering if it changed."""
+        if color != self.color:
+            self.color = color
+            self.update_image()
 
     def draw(self, screen):
-        """Update and draw the latest image to the screen."""
-        self.update_image()
+        """Draw the latest image to the screen."""
         screen.blit(self.image, self.rect)
 
 
 class Fighter(pygame.sprite.LayeredUpdates):
+    """A fighter's genes and results, drawn as torso, weapon and vision sprites.
+
+    Fighters are simulated by World, sync() updates the view from it. The
+    sprites are only created when first used, so fighters that are never
+    drawn (headless runs, worker processes, bred children) stay cheap."""
 
-    def __init__(self, id, color, radius, x, y, angle, random_weights=False):
-        """Initialize a new Fighter."""
+    def __init__(self, id, color, radius, x, y, angle, random_weights=False, Q=None):
+        """Initialize a new Fighter, with Q-table Q if given."""
         super().__init__()
 
         self.id = id
         self.color = color
         self.radius = radius
         self.angle = angle
-        self.speed = FIGHTER_SPEED
         self.unit_dx, self.unit_dy = angle_to_unit_x_y(self.angle)
-        self.dx, self.dy = angle_to_x_y(self.angle, self.speed)
+        self.x, self.y = x, y  # top left of the torso
+        self.weapon_radius = int(radius / 3)
+        self.has_sprites = False
 
         self.reset_state()
 
         # Initialize Q-table with weights
-        if random_weights:
+        if Q is not None:
+            self.Q = Q
+        elif random_weights:
             self.Q = np.random.random((NUM_STATES, NUM_ACTIONS))
         else:
             try:
                 # Initialize Q-table with weights from previous session
-                self.Q = np.loadtxt(MODEL_FILE, delimiter=",")
+                self.Q = load_model()
             except FileNotFoundError:
                 print("Model not found, initializing fighter", self.id, "with random weights...")
                 self.Q = np.random.random((NUM_STATES, NUM_ACTIONS))
-
-        self.weapon_radius = int(radius / 3)
-        self.torso = SmoothCircle(color, radius, x, y)
-        self.weapon = SmoothCircle(GRAY, self.weapon_radius,
-                                   x=x+radius-self.weapon_radius, y=y+radius, bg_color=color)
-        self.vision = Vision(id, self.get_center(), self.angle, GRAY, GRAY, GRAY)
+        self.Q = quantize(self.Q)  # stored as Q_DTYPE
+        self.visits = np.zeros(NUM_STATES, dtype=np.int64)  # times each state was acted in, over its lifetime
+
+    def __getattr__(self, name):
+        # sprites are created on first use
+        if name in ("torso", "weapon", "vision") and not self.__dict__.get("has_sprites", True):
+            self.create_sprites()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def create_sprites(self):
+        """Create the torso, weapon and vision sprites at the current position."""
+        self.has_sprites = True
+        self.torso = SmoothCircle(self.color, self.radius, self.x, self.y)
+        self.weapon = SmoothCircle(GRAY, self.weapon_radius, x=self.x, y=self.y, bg_color=self.color)
+        self.place_weapon()
+        self.vision = Vision(self.id, self.get_center(), self.angle, GRAY, GRAY, GRAY)
 
         self.add(self.torso)
         self.add(self.weapon)
         self.add(self.vision)
+        self.move_to_back(self.vision)  # layered below fighter sprite
 
     def reset_state(self):
         """Reset observations/state of the fighter."""
         self.reloading = False
-        self.last_shot_time = 0
         self.bullet_on_left = False
         self.bullet_on_right = False
         self.fighter_on_left = False
@@ -99,7 +121,7 @@ class Fighter(pygame.sprite.LayeredUpdates):
         self.damage = 0
         self.hits = 0
 
-        self.state = self.get_state(prev_state=0)
+        self.state = 0
 
     def set_random_angle(self):
         """Orient the fighter to a random angle."""
@@ -108,100 +130,39 @@ class Fighter(pygame.sprite.LayeredUpdates):
 
     def set_position(self, x, y):
         """Move fighter to position and maintain orientation."""
-        self.torso.rect.x = x
-        self.torso.rect.y = y
-        self.weapon.rect.x = x+self.radius-self.weapon_radius
-        self.weapon.rect.y = y+self.radius
+        self.x, self.y = x, y
+        if self.has_sprites:
+            self.torso.set_position(x, y)
+            self.place_weapon()
 
     def rotate_by(self, angle):
-        """Rotate sprite by angle and update dx dy movement components."""
+        """Rotate sprite by angle."""
         self.angle += angle
         self.angle %= 360
 
         # get x y vector components from current fighter angle
         self.unit_dx, self.unit_dy = angle_to_unit_x_y(self.angle)
 
-        # move weapon sprite around inner radius according to current angle
-        inner_radius = self.torso.radius - self.weapon.radius
-        self.weapon.rect.x = self.torso.rect.x + inner_radius + (self.unit_dx * inner_radius)
-        self.weapon.rect.y = self.torso.rect.y + inner_radius + (self.unit_dy * inner_radius)
-
-        self.dx = self.unit_dx * self.speed
-        self.dy = self.unit_dy * self.speed
-
-    def turn_left(self):
-        """Turn left by turning rate degrees."""
-        self.rotate_by(-TURNING_RATE)
-
-    def turn_right(self):
-        """Turn right by turning rate degrees."""
-        self.rotate_by(TURNING_RATE)
-
-    def move_forward(self):
-        """Attempt to move forward."""
-        actual_dx = self.dx
-        actual_dy = self.dy
-        if (self.torso.rect.x + self.dx) < 0 or \
-                (self.torso.rect.x + self.dx + self.torso.radius * 2) > WIDTH:
-            actual_dx = 0  # cannot run out of bounds
-        if (self.torso.rect.y + self.dy) < 0 or \
-                (self.torso.rect.y + self.dy + self.torso.radius * 2) > HEIGHT:
-            actual_dy = 0  # cannot run out of bounds
-
-        for sprite in self.sprites():
-            sprite.rect.x += actual_dx
-            sprite.rect.y += actual_dy
-
-    def shoot(self):
-        """If not reloading, trigger a shoot event."""
-        if not self.reloading:
-            self.reloading = True
-            self.last_shot_time = pygame.time.get_ticks()
-
-            # post a new SHOOT_EVENT
-            event_data = {
-                'shooter': self.id,
-                'x': self.weapon.rect.x,
-                'y': self.weapon.rect.y,
-                'angle': self.angle
-            }
-            pygame.event.post(pygame.event.Event(SHOOT_EVENT, event_data))
+        if self.has_sprites:
+            self.place_weapon()
+
+    def place_weapon(self):
+        """Move weapon sprite around inner radius according to current angle."""
+        inner_radius = self.radius - self.weapon_radius
+        self.weapon.set_position(int(self.x + inner_radius + (self.unit_dx * inner_radius)),
+                                 int(self.y + inner_radius + (self.unit_dy * inner_radius)))
 
     def get_center(self):
         """Return tuple of fighter center coordinate."""
-        return int(self.torso.rect.x + self.torso.radius), int(self.torso.rect.y + self.torso.radius)
-
-    def get_state(self, prev_state):
-        """Get current state based observations and previous state."""
-        state = (self.fighter_on_left << 5) + (self.fighter_on_right << 4) + \
-                (self.bullet_on_left << 3) + (self.bullet_on_left << 2) + \
-                (self.reloading << 1) + (self.on_target << 0)  # arbitrary order
-        state *= prev_state  # unique state based on previous state
-        return state
+        return int(self.x + self.radius), int(self.y + self.radius)
 
     def set_color(self, color):
-        self.torso.color = color
-        self.torso.update_image()
-
-    def update(self, actions):
-        """Update fighter state/action before it is drawn."""
-        # execute action
-        action_func_dict = {
-            0: self.turn_left,
-            1: self.turn_right,
-            2: self.move_forward,
-            3: self.shoot
-        }
-        for action_type, do_action in enumerate(actions.tolist()[0]):
-            if do_action:
-                action_func_dict[action_type]()
-
-        # update state
-        prev_state = self.state
-        self.state = self.get_state(prev_state)
-
-        # create new vision sprite with updated colors
-        self.vision.kill()
+        self.color = color
+        if self.has_sprites:
+            self.torso.set_color(color)
+
+    def update_vision(self):
+        """Update vision rays with the current position and colors."""
         color_left = color_middle = color_right = GRAY
         if self.fighter_on_left:
             color_left = color_middle = ORANGE
@@ -214,10 +175,25 @@ class Fighter(pygame.sprite.LayeredUpdates):
         if self.on_target:
             color_middle = GREEN
 
-        self.vision = Vision(self.id, self.get_center(), self.angle,
-                             color_left, color_middle, color_right)
-        self.add(self.vision)
-        self.move_to_back(self.vision)  # layered below fighter sprite
+        self.vision.update(self.get_center(), self.angle, color_left, color_middle, color_right)
+
+    def sync(self, world, i):
+        """Update this view from fighter i of a World simulation."""
+        self.set_position(int(world.x[i]) - self.radius, int(world.y[i]) - self.radius)
+        if world.angle[i] != self.angle:
+            self.rotate_by(world.angle[i] - self.angle)
+
+        self.reloading = bool(world.reloading[i])
+        self.bullet_on_left = bool(world.bullet_on_left[i])
+        self.bullet_on_right = bool(world.bullet_on_right[i])
+        self.fighter_on_left = bool(world.fighter_on_left[i])
+        self.fighter_on_right = bool(world.fighter_on_right[i])
+        self.on_target = bool(world.on_target[i])
+        self.state = int(world.state[i])
+        self.hits = int(world.hits[i])
+        self.damage = int(world.damage[i])
+
+        self.update_vision()
 
     def __str__(self):
         return "(id=" + str(self.id) + \
@@ -5,6 +5,23 @@ import numpy as np
 from colors import *
 from settings import *
 from fighter import Fighter
+from quantization import dequantize, quantize
+from sparse_q import SparseQ, visited_states
+
+
+breeding_rng = np.random.default_rng(SEED)
+
+
+def seed_generators(seed):
+    """Seed python's and numpy's global generators and breeding_rng from one seed.
+
+    seed is anything np.random.SeedSequence accepts, e.g. [seed, island]
+    for one stream per island."""
+    words = np.random.SeedSequence(seed).generate_state(3)
+    random.seed(int(words[0]))
+    np.random.seed(words[1])
+    # set in place, functions take breeding_rng as a default argument
+    breeding_rng.bit_generator.state = np.random.default_rng(words[2]).bit_generator.state
 
 
 def get_random_action_weights():
@@ -22,6 +39,17 @@ def get_probable_action(action_weights):
     return np.rint(np.greater(action_weights, np.random.random((1, NUM_ACTIONS))))
 
 
+def get_probable_actions(Q, states, rng=np.random):
+    """Get the actions of many fighters at once, from their stacked Q-tables.
+
+    Q has shape (fighters, NUM_STATES, NUM_ACTIONS) and states holds the
+    current state of every fighter. Each fighter's action is drawn like
+    get_probable_action, from one block of random numbers for all fighters.
+    Returns a boolean (fighters, NUM_ACTIONS) action array."""
+    action_weights = Q[np.arange(len(Q)), states]
+    return action_weights > rng.random(action_weights.shape)
+
+
 def get_random_action():
     """Get a random action."""
     return np.less_equal(get_random_action_weights())
@@ -31,67 +59,118 @@ def get_random_fighter_pos():
     return random.randint(0, WIDTH-36), random.randint(0, HEIGHT - 36)
 
 
-def create_random_fighter(id):
-    """Create a random fighter with a given id."""
+def create_random_fighter(id, Q=None):
+    """Create a random fighter with a given id, and Q-table Q if given."""
     x, y = get_random_fighter_pos()
     return Fighter(id=id, color=BLUE, radius=FIGHTER_RADIUS,
-                   x=x, y=y, angle=random.randint(0, 359))
+                   x=x, y=y, angle=random.randint(0, 359), Q=Q)
 
 
 def fitness(fighter):
     """Fitness of a fighter."""
 
-    # minimum is 1 because of the way 'get_probable_fit_fighter' is implemented
+    # minimum is 1 so every fighter can be selected as a parent (see select_parents)
     return max(fighter.hits - fighter.damage, 1)
 
 
-def get_probable_fit_fighter(population, total_fitness):
-    """Select a fighter with probability based on fitness."""
-    sorted_pop = sorted(population, key=lambda f: fitness(f))
+def fitness_array(fighters):
+    """Fitness of every fighter as an array."""
+    return np.array([fitness(f) for f in fighters])
+
 
-    count = 0
-    rand_index = random.randint(0, total_fitness)
-    for p in sorted_pop:
-        count += fitness(p)
-        if rand_index <= count:
-            return p
+def select_parents(fitnesses, num_pairs, rng=breeding_rng):
+    """Select num_pairs (parent1, parent2) index pairs with probability based on fitness.
+
+    Parents are sampled by binary search of a cumulative fitness table.
+    parent2 is never parent1, it is selected from the other fighters with
+    probability based on their fitness, unless there is only one fighter,
+    which is then paired with itself. Returns two index arrays."""
+    fitnesses = np.asarray(fitnesses)
+    if len(fitnesses) == 0:
+        raise ValueError("cannot select parents from an empty population")
+    cumulative = np.cumsum(fitnesses)
+    total = cumulative[-1]
+
+    parent1 = np.searchsorted(cumulative, rng.random(num_pairs) * total, side="right")
+    if len(fitnesses) == 1:
+        return parent1, parent1.copy()
+
+    # select from the fitness without parent1, skipping over its part of the table
+    parent1_fitness = fitnesses[parent1]
+    rand = rng.random(num_pairs) * (total - parent1_fitness)
+    rand += np.where(rand >= cumulative[parent1] - parent1_fitness, parent1_fitness, 0)
+    parent2 = np.searchsorted(cumulative, rand, side="right")
+
+    return parent1, parent2
 
 
 def get_parents(population):
     """Parents are more likely selected if they have better fitness."""
+    fighters = list(population)
+    parent1, parent2 = select_parents(fitness_array(fighters), 1)
+    return fighters[parent1[0]], fighters[parent2[0]]
 
-    total_fitness = sum([fitness(p) for p in population])
 
-    population_copy = list(population)
+def breed_Q(Q1, Q2, rng=breeding_rng):
+    """Breed the Q-tables of children from the stacked Q-tables of their parents.
 
-    # select parent 1
-    parent1 = get_probable_fit_fighter(population_copy, total_fitness)
+    Q1 and Q2 have shape (children, NUM_STATES, NUM_ACTIONS). Each child gets
+    the states before a random crossover point from parent 1 and the rest
+    from parent 2, then every weight is mutated and clipped to [0, 1]."""
+    Q1 = np.asarray(Q1)
+    Q2 = np.asarray(Q2)
+    num_children, num_states = Q1.shape[:2]
 
-    population_copy.remove(parent1)
-    total_fitness -= fitness(parent1)
+    # must at least crossover 1 gene
+    crossover_points = rng.integers(1, num_states - 1, size=num_children, endpoint=True)
+    from_parent1 = np.arange(num_states)[None, :] < crossover_points[:, None]
 
-    # select parent 2
-    parent2 = get_probable_fit_fighter(population_copy, total_fitness)
+    mutations = rng.choice([-ACTION_MUTATION_AMOUNT, 0, ACTION_MUTATION_AMOUNT],
+                           size=Q1.shape,
+                           p=[ACTION_MUTATION_RATE/2, 1 - ACTION_MUTATION_RATE, ACTION_MUTATION_RATE/2])
+    return np.clip(np.where(from_parent1[:, :, None], Q1, Q2) + mutations, 0, 1)
 
-    return parent1, parent2
 
+def breed_sparse_Q(parent1, parent2, rng=breeding_rng):
+    """Breed the sparse Q-table of a child from the states its parents visited.
 
-def breed_parents(child_id, parent1, parent2):
-    """Create a new child with the given child id."""
+    Like breed_Q, but only the rows of states either parent visited or has
+    explicit weights for are crossed over and mutated, the child's default
+    row is the mutated default of parent 1. Dense parents keep their
+    visited rows, see SparseQ.from_dense."""
+    rows = np.union1d(visited_states(parent1), visited_states(parent2))
+    Q1, Q2 = (p.Q if isinstance(p.Q, SparseQ) else SparseQ.from_dense(p.Q, visited_states(p))
+              for p in (parent1, parent2))
+    weights1 = dequantize(np.vstack([Q1.take(rows), Q1.default]))
+    weights2 = dequantize(np.vstack([Q2.take(rows), Q2.default]))
+
+    # must at least crossover 1 gene, the default row always comes from parent 1
+    crossover_point = rng.integers(1, NUM_STATES - 1, endpoint=True)
+    from_parent1 = np.append(rows < crossover_point, True)
 
-    child = create_random_fighter(child_id)
-    crossover_point = random.randint(1, NUM_STATES-1)  # must at least crossover 1 gene
+    mutations = rng.choice([-ACTION_MUTATION_AMOUNT, 0, ACTION_MUTATION_AMOUNT],
+                           size=weights1.shape,
+                           p=[ACTION_MUTATION_RATE/2, 1 - ACTION_MUTATION_RATE, ACTION_MUTATION_RATE/2])
+    weights = np.clip(np.where(from_parent1[:, None], weights1, weights2) + mutations, 0, 1)
+    return SparseQ(rows, weights[:-1], weights[-1])
 
-    for i in range(NUM_STATES):
-        mutations = np.random.choice([-ACTION_MUTATION_AMOUNT, 0, ACTION_MUTATION_AMOUNT],
-                                     size=NUM_ACTIONS,
-                                     p=[ACTION_MUTATION_RATE/2, 1 - ACTION_MUTATION_RATE, ACTION_MUTATION_RATE/2])
-        if i < crossover_point:
-            child.Q[i] = np.clip(parent1.Q[i] + mutations, 0, 1)
-        else:
-            child.Q[i] = np.clip(parent2.Q[i] + mutations, 0, 1)
 
-    return child
+def breed_children(child_ids, parents):
+    """Create new children with the given child ids from (parent1, parent2) pairs in one batch.
+
+    Children only hold their genes, their sprites are created when they are first drawn."""
+    if SPARSE_Q:
+        # bred one at a time, not batched like dense tables, as every child has its own rows
+        Q = [breed_sparse_Q(parent1, parent2) for parent1, parent2 in parents]
+    else:
+        Q = quantize(breed_Q(dequantize(np.stack([parent1.Q for parent1, _ in parents])),
+                             dequantize(np.stack([parent2.Q for _, parent2 in parents]))))
+    return [create_random_fighter(child_id, Q=child_Q) for child_id, child_Q in zip(child_ids, Q)]
+
+
+def breed_parents(child_id, parent1, parent2):
+    """Create a new child with the given child id."""
+    return breed_children([child_id], [(parent1, parent2)])[0]
 
 
 def get_random_population(size=POPULATION_SIZE):
@@ -108,8 +187,10 @@ def get_random_population(size=POPULATION_SIZE):
 
 def breed_population(population):
     """Breed the entire population."""
+    fighters = list(population.values())
+    fitnesses = fitness_array(fighters)  # before the state of the elite is reset
 
-    best_fighters = sorted(population.values(), key=lambda f: fitness(f), reverse=True)
+    best_fighters = [fighters[i] for i in np.argsort(-fitnesses, kind="stable")]
 
     new_population = {}
     for i in range(NUM_ELITE):
@@ -121,8 +202,11 @@ def breed_population(population):
         new_population[i].set_random_angle()  # reset fighter to random angle
         new_population[i].set_color(RED)      # make the elite red for easy visualization
 
-    for i in range(NUM_ELITE, POPULATION_SIZE):
-        parent1, parent2 = get_parents(new_population.values())
-        new_population[i] = breed_parents(i, parent1, parent2)
+    # parents are selected from the whole population, by the fitness it was evaluated with
+    child_ids = range(NUM_ELITE, POPULATION_SIZE)
+    parents1, parents2 = select_parents(fitnesses, len(child_ids))
+    parents = [(fighters[i], fighters[j]) for i, j in zip(parents1.tolist(), parents2.tolist())]
+    for child_id, child in zip(child_ids, breed_children(child_ids, parents)):
+        new_population[child_id] = child
 
     return new_population
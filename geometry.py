@@ -1,4 +1,6 @@
 """Helpful geometry functions."""
+import numpy as np
+
 from math import sin, cos, radians, degrees, sqrt, atan2
 
 
@@ -94,3 +96,38 @@ def get_line(start, end):
         points.reverse()
 
     return points
+
+
+def segment_intersects_circle(start, end, center, radius):
+    """Return true if the line segment from start to end passes through the circle.
+
+    Tests the continuous segment: true if its closest point to center is
+    nearer than radius. get_line points lie up to half a pixel off the
+    segment, so testing them instead can differ for segments passing within
+    half a pixel of tangency."""
+    sx, sy = start
+    dx, dy = end[0] - sx, end[1] - sy
+    cx, cy = center[0] - sx, center[1] - sy
+
+    # closest point of the segment to the circle center
+    length_sq = dx * dx + dy * dy
+    t = 0 if length_sq == 0 else max(0, min(1, (cx * dx + cy * dy) / length_sq))
+
+    return (dx * t - cx) ** 2 + (dy * t - cy) ** 2 < radius * radius
+
+
+def segments_intersect_circles(starts, ends, centers, radii):
+    """Vectorized segment_intersects_circle.
+
+    Takes arrays of segment start/end points and circle centers with a last
+    axis of size 2, and circle radii. Leading axes are broadcast against each
+    other, e.g. starts[:, None] and centers[None, :] test every pair."""
+    starts = np.asarray(starts, dtype=float)
+    d = np.asarray(ends, dtype=float) - starts
+    c = np.asarray(centers, dtype=float) - starts
+
+    # closest point of each segment to each circle center
+    length_sq = (d ** 2).sum(axis=-1)
+    t = np.clip((c * d).sum(axis=-1) / np.where(length_sq == 0, 1, length_sq), 0, 1)
+
+    return ((d * t[..., None] - c) ** 2).sum(axis=-1) < np.asarray(radii, dtype=float) ** 2
@@ -0,0 +1,24 @@
+"""Cache of pre-rendered sprite images."""
+import pygame
+import pygame.gfxdraw
+
+from functools import lru_cache
+
+from settings import *
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def circle_image(color, radius, bg_color):
+    """Return a shared image of a smooth circle on a transparent background.
+
+    The image is cached, it must not be drawn on."""
+    image = pygame.Surface([radius*2, radius*2])
+    image.fill(bg_color)
+    image.set_colorkey(bg_color)
+
+    cx = cy = radius  # center point of circle
+
+    # radius-1 otherwise circle is cut off around the edges
+    pygame.gfxdraw.aacircle(image, cx, cy, radius-1, color)
+    pygame.gfxdraw.filled_circle(image, cx, cy, radius-1, color)
+    return image
@@ -0,0 +1,104 @@
+"""Island model: sub-populations evolving in separate processes, exchanging their elite."""
+import multiprocessing
+import queue
+import numpy as np
+
+from settings import *
+from evaluation import run_generation
+from gene_functions import create_random_fighter, get_random_population, seed_generators
+
+
+TOPOLOGIES = ("ring", "all", "random")
+
+
+def migration_targets(island, num_islands, topology, migration, seed):
+    """Return the islands that island sends its elite to at the migration-th migration.
+
+    ring sends to the next island, all to every other island and random to
+    one other island, chosen the same way by every island so each island
+    receives from exactly one island."""
+    if topology == "ring":
+        return [(island + 1) % num_islands]
+    if topology == "all":
+        return [other for other in range(num_islands) if other != island]
+    shift = np.random.default_rng([seed, migration]).integers(1, num_islands)
+    return [(island + shift) % num_islands]
+
+
+def num_migrants(num_islands, topology):
+    """Number of elite migrations an island receives at every migration."""
+    return num_islands - 1 if topology == "all" else 1
+
+
+def run_island(island, num_islands, generations, migration_interval, topology, seed,
+               inboxes, results, num_arenas=NUM_ARENAS, num_trials=NUM_TRIALS, arenas_per_batch=ARENAS_PER_BATCH):
+    """Evolve the population of one island, the target of a worker process.
+
+    Every migration_interval generations, the Q-tables of its NUM_ELITE best
+    fighters are put into the inboxes of its target islands, and immigrants
+    from its own inbox replace the last children of the bred population.
+    Puts (island, generation, stats, best Q-table) into results every generation."""
+    # every island needs its own random streams, forked processes share the parent's
+    seed_generators([seed, island])
+
+    population = get_random_population()
+    for generation in range(generations):
+        stats, best_fighter, next_population = run_generation(population, num_arenas=num_arenas,
+                                                              num_trials=num_trials,
+                                                              arenas_per_batch=arenas_per_batch)
+        stats = dict(island=island, **stats, immigrants=0)
+        elite_Q = [next_population[i].Q for i in range(NUM_ELITE)]
+
+        if num_islands > 1 and migration_interval > 0 and (generation + 1) % migration_interval == 0:
+            migration = (generation + 1) // migration_interval
+            for target in migration_targets(island, num_islands, topology, migration, seed):
+                inboxes[target].put(elite_Q)
+
+            immigrants = [Q for _ in range(num_migrants(num_islands, topology)) for Q in inboxes[island].get()]
+            immigrants = immigrants[:POPULATION_SIZE - NUM_ELITE]  # never replace the own elite
+            for i, Q in enumerate(immigrants):
+                child_id = POPULATION_SIZE - 1 - i
+                next_population[child_id] = create_random_fighter(child_id, Q=Q)
+            stats["immigrants"] = len(immigrants)
+
+        results.put((island, generation, stats, best_fighter.Q))
+        population = next_population
+
+
+def run_islands(num_islands, generations=NUM_GENERATIONS, migration_interval=MIGRATION_INTERVAL,
+                topology=MIGRATION_TOPOLOGY, seed=None, num_arenas=NUM_ARENAS, num_trials=NUM_TRIALS,
+                arenas_per_batch=ARENAS_PER_BATCH):
+    """Evolve num_islands populations in worker processes, always headless.
+
+    Yields (island, generation, stats, best Q-table) as islands finish their
+    generations. Raises RuntimeError if an island process dies."""
+    if topology not in TOPOLOGIES:
+        raise ValueError("unknown migration topology " + repr(topology))
+    if seed is None:
+        seed = np.random.randint(2**31)
+
+    inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_island, name="island-%d" % island, daemon=True,
+                                         args=(island, num_islands, generations, migration_interval, topology,
+                                               seed, inboxes, results, num_arenas, num_trials, arenas_per_batch))
+                 for island in range(num_islands)]
+    for process in processes:
+        process.start()
+
+    try:
+        for _ in range(num_islands * generations):
+            while True:
+                try:
+                    yield results.get(timeout=1)
+                    break
+                except queue.Empty:
+                    failed = [p.name for p in processes if p.exitcode not in (None, 0)]
+                    if failed:
+                        raise RuntimeError("island process died: " + ", ".join(failed))
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,115 @@
+"""Per-generation metrics, written from a background thread."""
+import csv
+import json
+import os
+import queue
+import threading
+
+from settings import *
+
+
+class JsonlSink:
+    """Write each generation's stats as one JSON object per line."""
+
+    def __init__(self, log_dir):
+        self.file = open(os.path.join(log_dir, "metrics.jsonl"), "a")
+
+    def write(self, stats):
+        self.file.write(json.dumps(stats) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+    """Write each generation's stats as one CSV row, with a header from the first one."""
+
+    def __init__(self, log_dir):
+        self.file = open(os.path.join(log_dir, "metrics.csv"), "a", newline="")
+        self.writer = None
+
+    def write(self, stats):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(stats))
+            self.writer.writeheader()
+        self.writer.writerow(stats)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class TensorBoardSink:
+    """Write each generation's stats as TensorBoard scalars."""
+
+    def __init__(self, log_dir):
+        import tensorflow as tf  # only imported when this backend is chosen
+        self.tf = tf
+        if hasattr(tf.summary, "create_file_writer"):  # TensorFlow 2
+            self.writer = tf.summary.create_file_writer(log_dir)
+        else:
+            self.writer = tf.summary.FileWriter(log_dir)
+
+    def write(self, stats):
+        tf = self.tf
+        step = stats["generation"]
+        scalars = {tag: value for tag, value in stats.items() if tag != "generation"}
+        if hasattr(tf.summary, "create_file_writer"):
+            with self.writer.as_default():
+                for tag, value in scalars.items():
+                    tf.summary.scalar(tag, value, step=step)
+        else:
+            values = [tf.Summary.Value(tag=tag, simple_value=value) for tag, value in scalars.items()]
+            self.writer.add_summary(tf.Summary(value=values), step)
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+SINKS = {
+    "jsonl": JsonlSink,
+    "csv": CsvSink,
+    "tensorboard": TensorBoardSink,
+}
+
+
+class MetricsWriter:
+    """Hand stats to a sink that writes them on a background thread.
+
+    write() never blocks on file or TensorBoard I/O."""
+
+    def __init__(self, sink):
+        """Initialize a writer for a sink (see SINKS), None to discard all stats."""
+        self.sink = sink
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="metrics-writer", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def create(cls, metrics_format=METRICS_FORMAT, log_dir=METRICS_DIR):
+        """Create a writer for a format in SINKS (or "none") logging to log_dir."""
+        if metrics_format == "none":
+            return cls(None)
+        os.makedirs(log_dir, exist_ok=True)
+        return cls(SINKS[metrics_format](log_dir))
+
+    def run(self):
+        while True:
+            stats = self.queue.get()
+            if stats is None:
+                break
+            if self.sink is not None:
+                self.sink.write(stats)
+
+    def write(self, generation, **stats):
+        """Queue the stats of a generation to be written."""
+        self.queue.put(dict(generation=generation, **stats))
+
+    def close(self):
+        """Write all queued stats and close the sink."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.sink is not None:
+            self.sink.close()
@@ -0,0 +1,77 @@
+"""Loading and saving of fighter models (Q-tables)."""
+import os
+import numpy as np
+
+from settings import *
+from quantization import dequantize
+from sparse_q import SparseQ
+
+
+# parsed models by (path, modification time, size), so files are read once per process
+_cache = {}
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def latest_model_file():
+    """Return the last saved of MODEL_FILE and SPARSE_MODEL_FILE, MODEL_FILE if neither exists."""
+    existing = [path for path in (MODEL_FILE, SPARSE_MODEL_FILE) if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else MODEL_FILE
+
+
+def load_model(path=None, csv_path=MODEL_CSV_FILE, mmap=False):
+    """Load a Q-table from a .npy or .csv file, or a SparseQ from a .npz file.
+
+    path defaults to the last saved best model (see latest_model_file). If
+    path does not exist the model is imported from csv_path instead.
+    Each file is parsed at most once per process, the returned array is
+    shared and read-only. With mmap, .npy files are memory-mapped instead
+    of read. Raises FileNotFoundError if neither file exists."""
+    if path is None:
+        path = latest_model_file()
+    if not os.path.exists(path) and csv_path and os.path.exists(csv_path):
+        path = csv_path
+
+    key = _cache_key(path) + (mmap,)
+    if key not in _cache:
+        if path.endswith(".csv"):
+            Q = np.loadtxt(path, delimiter=",")
+        elif path.endswith(".npz"):
+            with np.load(path) as arrays:
+                Q = SparseQ(arrays["rows"], arrays["values"], arrays["default"], int(arrays["num_states"]))
+        else:
+            Q = np.load(path, mmap_mode="r" if mmap else None)
+        for array in (Q.rows, Q.values, Q.default) if isinstance(Q, SparseQ) else (Q,):
+            array.flags.writeable = False
+
+        # older versions of the same file are never needed again
+        for old_key in [k for k in _cache if k[0] == key[0]]:
+            del _cache[old_key]
+        _cache[key] = Q
+    return _cache[key]
+
+
+def save_model(Q, path=None):
+    """Save a Q-table as .npy, or as .csv if path ends with .csv.
+
+    .npy files keep the dtype of Q (see quantization), .csv files always
+    hold float weights. A SparseQ saved to a .npz path keeps only its
+    explicit rows, any other path gets the full table. path defaults to
+    SPARSE_MODEL_FILE for a SparseQ and MODEL_FILE otherwise."""
+    if path is None:
+        path = SPARSE_MODEL_FILE if isinstance(Q, SparseQ) else MODEL_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # write next to the target and rename, so readers never see partial files
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        if path.endswith(".csv"):
+            np.savetxt(f, np.asarray(dequantize(Q)), delimiter=",")
+        elif path.endswith(".npz") and isinstance(Q, SparseQ):
+            np.savez(f, rows=Q.rows, values=Q.values, default=Q.default, num_states=Q.num_states)
+        else:
+            np.save(f, np.asarray(Q))
+    os.replace(tmp_path, path)
@@ -0,0 +1,101 @@
+"""Low-overhead timers and counters for the phases of the simulation loop."""
+import time
+
+from settings import *
+
+
+class _NullPhase:
+    """Context manager doing nothing, shared by every phase of a disabled profiler."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """Accumulated wall time and calls of one phase."""
+    __slots__ = ("seconds", "calls", "start")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds += time.perf_counter() - self.start
+        self.calls += 1
+        return False
+
+
+class Profiler:
+    """Time phases and count events of the simulation loop, aggregated until reset.
+
+    Usage:
+        with profiler.phase("sense"):
+            world.sense(clock_time)
+        profiler.count("bullets", world.num_bullets)
+
+    A disabled profiler (the default) returns a shared no-op context
+    manager and ignores counts, so instrumented code costs one method call."""
+
+    def __init__(self, enabled=PROFILE):
+        """Initialize a profiler, collecting nothing unless enabled."""
+        self.enabled = enabled
+        self.phases = {}  # in order of first use
+        self.counters = {}
+
+    def phase(self, name):
+        """Return a context manager adding the time spent in it to phase name."""
+        if not self.enabled:
+            return _NULL_PHASE
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase()
+        return phase
+
+    def count(self, name, n=1):
+        """Add n to counter name."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        """Clear all phases and counters, e.g. at the start of a generation."""
+        self.phases = {}
+        self.counters = {}
+
+    def summary(self):
+        """Return the seconds and calls of every phase and the value of every counter.
+
+        Keys are "<phase>_seconds", "<phase>_calls" and the counter names,
+        so the summary can be passed on to MetricsWriter.write."""
+        stats = {}
+        for name, phase in self.phases.items():
+            stats[name + "_seconds"] = phase.seconds
+            stats[name + "_calls"] = phase.calls
+        stats.update(self.counters)
+        return stats
+
+    def format(self):
+        """Return a one-line summary: time per phase and counters per tick if "ticks" is counted."""
+        if not self.enabled:
+            return ""
+        total = sum(phase.seconds for phase in self.phases.values()) or 1.0
+        parts = ["%s %.3fs (%d%%)" % (name, phase.seconds, round(100 * phase.seconds / total))
+                 for name, phase in self.phases.items()]
+
+        ticks = self.counters.get("ticks")
+        for name, value in self.counters.items():
+            if ticks and name != "ticks":
+                parts.append("%s/tick %.1f" % (name, value / ticks))
+            else:
+                parts.append("%s %d" % (name, value))
+        return ", ".join(parts)
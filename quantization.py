@@ -0,0 +1,45 @@
+"""Compact fixed-point or half precision storage of Q-tables."""
+import numpy as np
+
+from settings import *
+from sparse_q import SparseQ
+
+
+Q_DTYPES = ("float64", "float32", "float16", "uint16", "uint8")
+
+
+def quantize(Q, dtype=Q_DTYPE):
+    """Convert a Q-table of weights in [0, 1] to a storage dtype in Q_DTYPES.
+
+    Unsigned integer dtypes store weights as fixed-point fractions of their
+    largest value, e.g. round(w * 255) for uint8. Returns Q itself if it
+    already has dtype. The error added is at most quantization_error(dtype)."""
+    if isinstance(Q, SparseQ):
+        return SparseQ(Q.rows, quantize(Q.values, dtype), quantize(Q.default, dtype), Q.num_states)
+    dtype = np.dtype(dtype)
+    Q = np.asarray(Q)
+    if Q.dtype == dtype:
+        return Q
+    if dtype.kind == "u":
+        return np.rint(np.clip(dequantize(Q), 0, 1) * np.iinfo(dtype).max).astype(dtype)
+    return dequantize(Q, dtype)
+
+
+def dequantize(Q, dtype=float):
+    """Convert a Q-table stored in any dtype of Q_DTYPES to float weights in [0, 1].
+
+    Returns Q itself if it already has dtype."""
+    if isinstance(Q, SparseQ):
+        return SparseQ(Q.rows, dequantize(Q.values, dtype), dequantize(Q.default, dtype), Q.num_states)
+    Q = np.asarray(Q)
+    if Q.dtype.kind == "u":
+        return (Q / np.iinfo(Q.dtype).max).astype(dtype, copy=False)
+    return Q.astype(dtype, copy=False)
+
+
+def quantization_error(dtype=Q_DTYPE):
+    """Return the largest absolute error quantize adds to a weight in [0, 1]."""
+    dtype = np.dtype(dtype)
+    if dtype.kind == "u":
+        return 0.5 / np.iinfo(dtype).max  # half a fixed-point step
+    return 0.5 * np.finfo(dtype).eps  # rounding of values at most 1
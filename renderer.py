@@ -0,0 +1,90 @@
+"""Dirty-rect rendering of a World through its sprite views."""
+import numpy as np
+import pygame
+
+from bullet import Bullet
+from colors import *
+from settings import *
+from fighter import Fighter
+
+
+VISION_LAYER = 0
+FIGHTER_LAYER = 1
+WEAPON_LAYER = 2
+BULLET_LAYER = 3
+
+
+def fighter_views(colors, x, y, angles):
+    """Create fighter sprites that only serve as views of a World's fighters (see Fighter.sync)."""
+    return [Fighter(id=i, color=tuple(color), radius=FIGHTER_RADIUS,
+                    x=int(x[i]) - FIGHTER_RADIUS, y=int(y[i]) - FIGHTER_RADIUS,
+                    angle=float(angles[i]), Q=np.empty((0, NUM_ACTIONS)))
+            for i, color in enumerate(colors)]
+
+
+class Renderer:
+    """Draw fighters and bullets, only updating the parts of the screen that changed."""
+
+    def __init__(self, screen, font, update_display=True):
+        """Initialize a renderer for a screen surface.
+
+        Without update_display, frames are only drawn onto the surface, which
+        does not need to be the display surface."""
+        self.screen = screen
+        self.update_display = update_display
+        self.font = font
+        self.background = pygame.Surface(screen.get_size())
+
+        self.sprites = pygame.sprite.LayeredDirty()
+        self.sprites.clear(screen, self.background)
+
+        self.fighters = []
+        self.bullet_views = []  # one per bullet pool slot, reused for the bullets of every frame
+        self.shown_slots = np.empty(0, dtype=int)  # slots whose bullet views are visible
+
+    def reset(self, fighters, label_str):
+        """Show a new set of fighters under a label and repaint the whole screen."""
+        self.sprites.empty()
+        self.fighters = list(fighters)
+        for fighter in self.fighters:
+            self.sprites.add(fighter.vision, layer=VISION_LAYER)
+            self.sprites.add(fighter.torso, layer=FIGHTER_LAYER)
+            self.sprites.add(fighter.weapon, layer=WEAPON_LAYER)
+        for bullet_view in self.bullet_views:
+            bullet_view.visible = 0
+            self.sprites.add(bullet_view, layer=BULLET_LAYER)
+        self.shown_slots = np.empty(0, dtype=int)
+
+        self.background.fill(WHITE)
+        self.background.blit(self.font.render(label_str, 1, BLACK), (10, 10))
+        self.screen.blit(self.background, (0, 0))
+        self.sprites.repaint_rect(self.screen.get_rect())
+
+    def draw(self, world):
+        """Draw the current state of the world and update the display."""
+        for i, fighter in enumerate(self.fighters):
+            fighter.sync(world, i)
+
+        # one view per bullet pool slot, shown while its slot holds a bullet
+        bullets = world.bullets
+        while len(self.bullet_views) < bullets.capacity:
+            bullet_view = Bullet(None, 0, 0, 0, 0)
+            bullet_view.visible = 0
+            self.bullet_views.append(bullet_view)
+            self.sprites.add(bullet_view, layer=BULLET_LAYER)
+
+        live = bullets.live()
+        for slot, x, y in zip(live.tolist(), bullets.x[live].tolist(), bullets.y[live].tolist()):
+            bullet_view = self.bullet_views[slot]
+            bullet_view.rect.center = (int(x), int(y))
+            bullet_view.visible = 1
+            bullet_view.dirty = 1
+
+        # only hide views shown last frame, hiding marks a view dirty and repaints its rect
+        for slot in np.setdiff1d(self.shown_slots, live, assume_unique=True).tolist():
+            self.bullet_views[slot].visible = 0
+        self.shown_slots = live
+
+        rects = self.sprites.draw(self.screen)
+        if self.update_display:
+            pygame.display.update(rects)
@@ -0,0 +1,214 @@
+"""Compact binary recording and playback of simulated generations.
+
+A replay file starts with MAGIC and holds one chunk per recorded generation:
+a CHUNK_HEADER, the colors of its fighters, one FIGHTER_RECORD per fighter
+for the start position and each tick, and one SPAWN_RECORD per bullet."""
+import os
+import numpy as np
+import pygame
+
+from colors import *
+from settings import *
+from renderer import fighter_views
+from world import World
+
+
+MAGIC = b"RSREPLAY1\n"
+
+CHUNK_HEADER = np.dtype([("generation", "<i4"), ("num_fighters", "<i4"),
+                         ("num_ticks", "<i4"), ("num_spawns", "<i4")])
+FIGHTER_RECORD = np.dtype([("x", "<f4"), ("y", "<f4"), ("angle", "<f4"), ("actions", "u1")])
+SPAWN_RECORD = np.dtype([("tick", "<i4"), ("shooter", "<i4"),
+                         ("x", "<f4"), ("y", "<f4"), ("dx", "<f4"), ("dy", "<f4")])
+
+
+def pack_actions(actions):
+    """Pack an (n, NUM_ACTIONS) action array into one bit field per fighter."""
+    return (np.asarray(actions, dtype=np.uint8) << np.arange(NUM_ACTIONS, dtype=np.uint8)).sum(axis=1)
+
+
+class ReplayRecorder:
+    """Append the simulation of generations to a replay file."""
+
+    def __init__(self, path=None):
+        """Initialize a recorder appending to path, or only returning chunks from end() without one."""
+        self.path = path
+        if path is not None and (not os.path.exists(path) or os.path.getsize(path) == 0):
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+        self.generation = None
+
+    def begin(self, generation, world, colors):
+        """Start recording a generation from the current state of a world."""
+        self.generation = generation
+        self.colors = np.asarray(colors, dtype=np.uint8).reshape(world.num_fighters, 3)
+        self.ticks = []
+        self.spawns = []
+        self.record(world, np.zeros((world.num_fighters, NUM_ACTIONS)), tick=-1)
+
+    def record(self, world, actions, tick=None):
+        """Record the world after a step with actions."""
+        if tick is None:
+            tick = len(self.ticks) - 1
+
+        fighters = np.empty(world.num_fighters, dtype=FIGHTER_RECORD)
+        fighters["x"] = world.x
+        fighters["y"] = world.y
+        fighters["angle"] = world.angle
+        fighters["actions"] = pack_actions(actions)
+        self.ticks.append(fighters)
+
+        spawned = world.spawned
+        if tick >= 0 and len(spawned):
+            spawns = np.empty(len(spawned), dtype=SPAWN_RECORD)
+            spawns["tick"] = tick
+            bullets = world.bullets
+            spawns["shooter"] = bullets.shooter[spawned]
+            spawns["x"] = bullets.x[spawned]
+            spawns["y"] = bullets.y[spawned]
+            spawns["dx"] = bullets.dx[spawned]
+            spawns["dy"] = bullets.dy[spawned]
+            self.spawns.append(spawns)
+
+    def end(self):
+        """Append the recorded generation as a chunk to the file and return the chunk's bytes.
+
+        ReplayChunk(np.frombuffer(data, np.uint8), 0) reads the returned bytes."""
+        fighters = np.stack(self.ticks)
+        spawns = np.concatenate(self.spawns) if self.spawns else np.empty(0, dtype=SPAWN_RECORD)
+
+        header = np.array([(self.generation, fighters.shape[1], len(fighters) - 1, len(spawns))],
+                          dtype=CHUNK_HEADER)
+        data = b"".join(array.tobytes() for array in (header, self.colors, fighters, spawns))
+        if self.path is not None:
+            with open(self.path, "ab") as f:
+                f.write(data)
+        self.generation = None
+        return data
+
+
+def view(buffer, shape, dtype, offset):
+    """Return an array of shape and dtype viewing buffer at offset.
+
+    Raises EOFError if the buffer ends before the array, e.g. in the last
+    chunk of a run that crashed while recording."""
+    shape = np.atleast_1d(shape)
+    if np.any(shape < 0) or offset + np.prod(shape) * np.dtype(dtype).itemsize > len(buffer):
+        raise EOFError("replay chunk at offset %d is truncated" % offset)
+    return np.ndarray(tuple(shape.tolist()), dtype, buffer, offset)
+
+
+class ReplayChunk:
+    """A recorded generation, backed by a memory-mapped replay file."""
+
+    def __init__(self, buffer, offset):
+        """Read the chunk at offset of a buffer, raises EOFError if it was not completely written."""
+        header = view(buffer, 1, CHUNK_HEADER, offset)[0]
+        self.generation = int(header["generation"])
+        self.num_fighters = n = int(header["num_fighters"])
+        self.num_ticks = int(header["num_ticks"])
+        offset += CHUNK_HEADER.itemsize
+
+        self.colors = view(buffer, (n, 3), np.uint8, offset)
+        offset += self.colors.nbytes
+        self.fighters = view(buffer, (self.num_ticks + 1, n), FIGHTER_RECORD, offset)
+        offset += self.fighters.nbytes
+        self.spawns = view(buffer, int(header["num_spawns"]), SPAWN_RECORD, offset)
+        self.end = offset + self.spawns.nbytes
+
+    def actions(self, tick):
+        """Return the (num_fighters, NUM_ACTIONS) actions taken at a tick."""
+        bits = self.fighters["actions"][tick + 1]
+        return (bits[:, None] >> np.arange(NUM_ACTIONS)) & 1
+
+    def worlds(self):
+        """Reconstruct the world at the end of every tick.
+
+        Yields the same World object for every tick, its observations and
+        bullets are simulated again from the recorded fighters and spawns."""
+        start = self.fighters[0]
+        world = World(np.stack([start["x"], start["y"]], axis=1), start["angle"])
+        spawn_ticks = np.searchsorted(self.spawns["tick"], np.arange(self.num_ticks + 1))
+
+        for tick in range(self.num_ticks):
+            world.sense(tick)
+            world.collide()
+
+            fighters = self.fighters[tick + 1]
+            world.x = fighters["x"].astype(float)
+            world.y = fighters["y"].astype(float)
+            world.angle = fighters["angle"].astype(float)
+            world.update_velocity()
+            world.move_bullets()
+
+            spawns = self.spawns[spawn_ticks[tick]:spawn_ticks[tick + 1]]
+            world.add_bullets(spawns["x"].astype(float), spawns["y"].astype(float),
+                              spawns["dx"].astype(float), spawns["dy"].astype(float),
+                              spawns["shooter"].astype(int))
+            yield world
+
+
+class ReplayFile:
+    """Memory-mapped replay file with an index of its generations.
+
+    Sessions appending to the same file can record the same generation more
+    than once, every chunk is kept in the order it was written."""
+
+    def __init__(self, path):
+        """Open a replay file and index its chunks."""
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self.buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(path + " is not a replay file")
+
+        self.offsets = {}  # chunk offsets of every generation, in file order
+        offset = len(MAGIC)
+        while offset < len(self.buffer):
+            try:
+                chunk = ReplayChunk(self.buffer, offset)
+            except EOFError:
+                break  # chunk was not completely written
+            self.offsets.setdefault(chunk.generation, []).append(offset)
+            offset = chunk.end
+
+    @property
+    def generations(self):
+        return sorted(self.offsets)
+
+    def chunks(self, generation):
+        """Return every recorded chunk of a generation, in file order."""
+        return [ReplayChunk(self.buffer, offset) for offset in self.offsets[generation]]
+
+    def __getitem__(self, generation):
+        """Return the last recorded chunk of a generation."""
+        return ReplayChunk(self.buffer, self.offsets[generation][-1])
+
+
+def play(path, screen, renderer, generations=None, step=False):
+    """Play recorded generations of a replay file on screen.
+
+    With step, every key press advances one tick instead of playing at FPS.
+    Every recorded chunk of a generation is played. Returns False if the
+    window was closed."""
+    replay = ReplayFile(path)
+    clock = pygame.time.Clock()
+
+    generations = generations if generations is not None else replay.generations
+    for chunk in [chunk for generation in generations for chunk in replay.chunks(generation)]:
+        start = chunk.fighters[0]
+        fighters = fighter_views(chunk.colors.tolist(), start["x"], start["y"], start["angle"])
+        renderer.reset(fighters, "Replay generation: " + str(chunk.generation))
+
+        for world in chunk.worlds():
+            renderer.draw(world)
+
+            waiting = step
+            while True:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return False
+                    elif event.type == pygame.KEYDOWN:
+                        waiting = False
+                clock.tick(FPS)
+                if not waiting:
+                    break
+    return True
@@ -1,5 +1,4 @@
 """Global application settings."""
-import pygame
 
 
 ####################################
@@ -10,28 +9,43 @@ WIDTH = 640   # 1280
 HEIGHT = 320  # 720
 FPS = 30  # not always achievable, but no harm trying
 
+IMAGE_CACHE_SIZE = 64  # number of pre-rendered sprite images to keep
+
+HEADLESS = False  # run without a window, measuring time in simulated ticks (frames)
+
+SPECTATE_EVERY = 1  # in spectator mode, generations shown live, e.g. 10 for every 10th generation
+SNAPSHOT_BUFFER_SIZE = 8  # latest simulation snapshots kept for the spectator window
+
+PROFILE = False  # time the phases of the simulation loop and print them every generation
+
 ####################################
 #         Fighter Settings         #
 ####################################
 
 TIME_TO_RELOAD = 1000  # milliseconds
+RELOAD_TICKS = TIME_TO_RELOAD * FPS // 1000  # frames, used in headless mode
 SIGHT_RANGE = max(WIDTH, HEIGHT) * 0.2  # pixels
 SIGHT_ANGLE = 30  # total view angle of 2*SIGHT_ANGLE (i.e. 60 degrees)
 
 BULLET_SPEED = 10  # pixels per frame
 BULLET_RADIUS = 8  # pixels
+BULLETS_PER_FIGHTER = 4  # preallocated bullet slots per fighter, more are allocated if they run out
 
 FIGHTER_SPEED = 2    # pixels per frame
 FIGHTER_RADIUS = 18  # pixels
 
 TURNING_RATE = 4  # degrees turned per "turn" action
 
+# cell size of the spatial grid used for vision and collision queries,
+# must be at least the farthest anything can be seen from a fighter center,
+# plus a pixel as middle ray ends are truncated to pixels and can reach up to
+# a pixel further than SIGHT_RANGE along an axis
+SPATIAL_GRID_CELL_SIZE = SIGHT_RANGE + FIGHTER_RADIUS + 1  # pixels
+
 NUM_OBSERVATIONS = 6  # bullet detected, fighter detected, on target, reloading, prev_state
 NUM_STATES = (2**NUM_OBSERVATIONS)**2  # squared because prev state is stored
 NUM_ACTIONS = 4  # turn left, turn right, move forward, shoot
 
-SHOOT_EVENT = pygame.USEREVENT + 1  # used for posting shoot events
-
 
 ##############################################
 #         Genetic Algorithm Settings         #
@@ -39,14 +53,48 @@ SHOOT_EVENT = pygame.USEREVENT + 1  # used for posting shoot events
 
 RESET_MODEL_EACH_SESSION = False  # reset model from application session to session
 
+SEED = None  # seed of the breeding random generator, None for a different seed every session
+
 NUM_GENERATIONS = 500
 POPULATION_SIZE = 6
 
 EPISODE_LENGTH = 12  # episode/trial length in seconds
+EPISODE_TICKS = EPISODE_LENGTH * FPS  # episode/trial length in frames, used in headless mode
 
 NUM_ELITE = 2  # number of most elite fighters to keep in next generation
 
 ACTION_MUTATION_RATE = .1  # independent probability of mutation per action
 ACTION_MUTATION_AMOUNT = .03  # amount to mutate weight in the positive or negative direction
 
-MODEL_FILE = "models/best_weights.csv"
+Q_DTYPE = "float64"  # Q-table storage: float64, float32, float16, or uint16/uint8 fixed-point
+SPARSE_Q = False  # breed children with sparse Q-tables holding only the states their parents visited
+
+MODEL_FILE = "models/best_weights.npy"  # binary, use a .csv path to save text instead
+MODEL_CSV_FILE = "models/best_weights.csv"  # imported if MODEL_FILE does not exist yet
+SPARSE_MODEL_FILE = "models/best_weights.npz"  # sparse best models, only their explicit rows
+
+CHECKPOINT_FILE = "models/checkpoint.npz"  # whole population and random states, to resume runs from
+CHECKPOINT_INTERVAL = 10  # generations between checkpoints, 0 to never write one
+
+METRICS_FORMAT = "jsonl"  # per-generation metrics format: jsonl, csv, tensorboard or none
+METRICS_DIR = "graphs"  # each session logs metrics to its own directory in here
+
+REPLAY_FILE = None  # replay file every simulated generation is appended to, None to not record
+
+EXPORT_DIR = "exports"  # exported generations are written in here
+EXPORT_FORMAT = "png"  # png (a directory of frames per generation) or gif (needs imageio)
+EXPORT_FRAME_STEP = 1  # export every Nth tick, e.g. 2 for half the frames
+
+
+################################################
+#         Parallel Evaluation Settings         #
+################################################
+
+EVALUATION_WORKERS = 0  # worker processes evaluating each generation, 0 to evaluate in the main process
+NUM_ARENAS = 1  # arenas the population is split into, each simulated independently and headless
+NUM_TRIALS = 1  # trials per arena with different random seeds, hits/damage are summed over trials
+ARENAS_PER_BATCH = 16  # arenas of the same size stepped together in one vectorized world
+
+NUM_ISLANDS = 0  # sub-populations evolving in separate processes, 0 for one population in this process
+MIGRATION_INTERVAL = 10  # generations between migrations of each island's elite, 0 for never
+MIGRATION_TOPOLOGY = "ring"  # islands the elite migrates to: ring (the next one), all or random (one)
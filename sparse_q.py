@@ -0,0 +1,72 @@
+"""Sparse Q-tables storing only the rows of states that were visited."""
+import numpy as np
+
+from settings import *
+
+
+class SparseQ:
+    """Q-table with explicit weights for some states and one default row for all others.
+
+    rows is the sorted array of states with explicit weights, values holds
+    their (len(rows), NUM_ACTIONS) weights. Converts to a dense table with
+    np.asarray, so it can be used wherever a dense Q-table is expected."""
+
+    def __init__(self, rows, values, default, num_states=NUM_STATES):
+        """Initialize a table of num_states states from explicit rows and a default row."""
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.values = np.asarray(values)
+        self.default = np.asarray(default)
+        self.num_states = num_states
+
+    @classmethod
+    def from_dense(cls, Q, rows, default=None):
+        """Keep the given rows of a dense table, the others are replaced by default.
+
+        default defaults to the mean of the kept rows, or of all rows if none are kept."""
+        Q = np.asarray(Q)
+        rows = np.unique(rows)
+        if default is None:
+            default = Q[rows].mean(axis=0) if len(rows) else Q.mean(axis=0)
+        return cls(rows, Q[rows], np.asarray(default, dtype=Q.dtype), len(Q))
+
+    @property
+    def shape(self):
+        return self.num_states, len(self.default)
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.values.nbytes + self.default.nbytes
+
+    def take(self, states):
+        """Return the weights of an array of states, the default row for states without explicit weights."""
+        states = np.asarray(states)
+        weights = np.empty(states.shape + self.default.shape, dtype=self.dtype)
+        weights[:] = self.default
+
+        i = np.searchsorted(self.rows, states)
+        found = i < len(self.rows)
+        found[found] = self.rows[i[found]] == states[found]
+        weights[found] = self.values[i[found]]
+        return weights
+
+    def to_dense(self, dtype=None):
+        """Return the full (num_states, NUM_ACTIONS) table."""
+        Q = np.empty(self.shape, dtype=dtype or self.dtype)
+        Q[:] = self.default
+        Q[self.rows] = self.values
+        return Q
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_dense(dtype)
+
+
+def visited_states(fighter):
+    """Return the states a fighter has weights for or has visited, sorted."""
+    visited = np.flatnonzero(fighter.visits)
+    if isinstance(fighter.Q, SparseQ):
+        return np.union1d(fighter.Q.rows, visited)
+    return visited
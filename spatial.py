@@ -0,0 +1,53 @@
+"""Uniform grid spatial index for neighbour queries."""
+import numpy as np
+
+
+# offsets of a cell and its 8 neighbours
+NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+
+class SpatialGrid:
+    """Points bucketed into square cells of cell_size pixels.
+
+    Any two points closer than cell_size are in the same or in adjacent
+    cells, so only the 3x3 cells around a query point have to be visited.
+    Points can be split into groups (e.g. arenas), which never neighbour
+    each other."""
+
+    def __init__(self, cell_size, x=(), y=(), groups=0):
+        """Initialize the grid, optionally with points."""
+        self.cell_size = cell_size
+        self.build(x, y, groups)
+
+    def cells(self, x, y):
+        """Return the cell coordinates of points."""
+        return (np.floor_divide(np.asarray(x, dtype=float), self.cell_size).astype(np.int64),
+                np.floor_divide(np.asarray(y, dtype=float), self.cell_size).astype(np.int64))
+
+    @staticmethod
+    def key(cell_x, cell_y, groups):
+        """Pack group and cell coordinates (less than 2**15 cells from 0) into one sortable integer."""
+        return (np.asarray(groups, dtype=np.int64) << 32) + (cell_x << 16) + cell_y
+
+    def build(self, x, y, groups=0):
+        """Rebuild the grid from point coordinates and groups, replacing previous points."""
+        keys = self.key(*self.cells(x, y), groups)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def query_pairs(self, x, y, groups=0):
+        """Return (query, point) index arrays pairing every query point with
+        every grid point of its group in its neighbouring cells."""
+        cell_x, cell_y = self.cells(x, y)
+        groups = np.broadcast_to(groups, cell_x.shape)
+        keys = self.key(cell_x[:, None] + NEIGHBOUR_OFFSETS[:, 0], cell_y[:, None] + NEIGHBOUR_OFFSETS[:, 1],
+                        groups[:, None])
+
+        # range of each neighbouring cell in the sorted points
+        start = np.searchsorted(self.sorted_keys, keys, side="left").ravel()
+        counts = np.searchsorted(self.sorted_keys, keys, side="right").ravel() - start
+
+        queries = np.repeat(np.repeat(np.arange(len(cell_x)), len(NEIGHBOUR_OFFSETS)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        points = self.order[np.repeat(start, counts) + offsets]
+        return queries, points
@@ -0,0 +1,72 @@
+"""Spectating a simulation running on another thread, through snapshots of its world."""
+import collections
+import threading
+import pygame
+
+from settings import *
+from renderer import fighter_views
+
+
+class Snapshot:
+    """Read-only copy of everything a Renderer draws of a World."""
+
+    FIELDS = ("x", "y", "angle", "reloading", "bullet_on_left", "bullet_on_right",
+              "fighter_on_left", "fighter_on_right", "on_target", "state", "hits", "damage")
+
+    def __init__(self, generation, tick, world, colors):
+        """Copy the state of a world at a tick of a generation, with the colors of its fighters."""
+        self.generation = generation
+        self.tick = tick
+        self.colors = colors
+        self.num_fighters = world.num_fighters
+
+        for name in self.FIELDS:
+            values = getattr(world, name).copy()
+            values.flags.writeable = False
+            setattr(self, name, values)
+        self.bullets = world.bullets.copy()
+
+
+class SnapshotBuffer:
+    """Bounded ring buffer of the latest snapshots, shared between threads.
+
+    Publishing never blocks, the oldest snapshots are dropped when full."""
+
+    def __init__(self, size=SNAPSHOT_BUFFER_SIZE):
+        """Initialize an empty buffer holding up to size snapshots."""
+        self.snapshots = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def publish(self, snapshot):
+        """Add a snapshot, dropping the oldest one if the buffer is full."""
+        with self.lock:
+            self.snapshots.append(snapshot)
+
+    def latest(self):
+        """Return the most recent snapshot, or None if none was published yet."""
+        with self.lock:
+            return self.snapshots[-1] if self.snapshots else None
+
+
+def spectate(snapshots, simulation, renderer, fps=FPS):
+    """Draw the latest snapshot at fps frames per second while the simulation thread runs.
+
+    Returns False if the window was closed."""
+    clock = pygame.time.Clock()
+    shown_generation = None
+
+    while simulation.is_alive():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+        snapshot = snapshots.latest()
+        if snapshot is not None:
+            if snapshot.generation != shown_generation:
+                shown_generation = snapshot.generation
+                fighters = fighter_views(snapshot.colors, snapshot.x, snapshot.y, snapshot.angle)
+                renderer.reset(fighters, "Generation: " + str(shown_generation))
+            renderer.draw(snapshot)
+
+        clock.tick(fps)
+    return True
@@ -0,0 +1,155 @@
+"""Hyperparameter sweeps: headless training runs with different settings, in parallel.
+
+Run with e.g. `python sweep.py POPULATION_SIZE=6,12 ACTION_MUTATION_RATE=0.05,0.1`
+for a grid search, or with --random N and NAME=low:high ranges for a random
+search. Every run trains in a fresh process with its own RunConfig, results
+are collected into one table."""
+import argparse
+import ast
+import csv
+import itertools
+import multiprocessing
+import sys
+import time
+import numpy as np
+
+from config import RunConfig
+
+
+def grid(space):
+    """Return every combination of the values of a {setting: [values]} space."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, num_runs, seed=None):
+    """Return num_runs random combinations of a {setting: values or (low, high)} space.
+
+    Lists are sampled uniformly, (low, high) tuples uniformly from the range,
+    as integers if both bounds are integers."""
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(num_runs):
+        overrides = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    overrides[name] = int(rng.integers(low, high, endpoint=True))
+                else:
+                    overrides[name] = float(rng.uniform(low, high))
+            else:
+                overrides[name] = values[rng.integers(len(values))]
+        configs.append(overrides)
+    return configs
+
+
+def run_config(overrides, generations, seed, num_arenas=1, num_trials=1):
+    """Train a random population with settings overridden and summarize its fitness.
+
+    Must run in a fresh process, see RunConfig.apply."""
+    config = RunConfig(**overrides)
+    evaluation, gene_functions = config.apply("evaluation", "gene_functions")
+
+    gene_functions.seed_generators(seed)
+
+    population = {i: gene_functions.create_random_fighter(i, Q=np.random.random((config.NUM_STATES,
+                                                                                  config.NUM_ACTIONS)))
+                  for i in range(config.POPULATION_SIZE)}
+    best_fitness = []
+    mean_fitness = []
+    start_time = time.perf_counter()
+    for generation in range(generations):
+        stats, _, population = evaluation.run_generation(population, num_arenas=num_arenas, num_trials=num_trials)
+        best_fitness.append(stats["best_fitness"])
+        mean_fitness.append(stats["mean_fitness"])
+
+    last = max(generations // 10, 1)  # final tenth of the run
+    return dict(overrides,
+                seed=seed,
+                best_fitness=max(best_fitness),
+                final_best_fitness=float(np.mean(best_fitness[-last:])),
+                final_mean_fitness=float(np.mean(mean_fitness[-last:])),
+                seconds=time.perf_counter() - start_time)
+
+
+def run_numbered(numbered_run):
+    """Run a (run number, run_config arguments) pair, returning its result row."""
+    run, arguments = numbered_run
+    return dict(run=run, **run_config(*arguments))
+
+
+def sweep(configs, generations, workers=None, seed=0, repeats=1, num_arenas=1, num_trials=1):
+    """Train every configuration (a dict of overrides) repeats times with different seeds.
+
+    Runs are fanned out over workers processes, each run in a new one. Yields a
+    result row per run as runs finish."""
+    runs = [(run, (overrides, generations, seed + repeat, num_arenas, num_trials))
+            for run, (overrides, repeat) in enumerate(itertools.product(configs, range(repeats)))]
+
+    # fresh settings in every run, a new process per run
+    with multiprocessing.get_context("spawn").Pool(workers, maxtasksperchild=1) as pool:
+        yield from pool.imap_unordered(run_numbered, runs)
+
+
+def format_table(rows):
+    """Format result rows as an aligned text table, best final fitness first."""
+    rows = sorted(rows, key=lambda row: row["final_best_fitness"], reverse=True)
+    columns = list(rows[0]) if rows else []
+    cells = [columns] + [["%.4g" % row[c] if isinstance(row[c], float) else str(row[c]) for c in columns]
+                         for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(line, widths)) for line in cells)
+
+
+def parse_space(specs, ranges):
+    """Parse NAME=v1,v2,... (and with ranges, NAME=low:high) specs into a search space."""
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if ranges and ":" in values:
+            space[name] = tuple(ast.literal_eval(value) for value in values.split(":"))
+        else:
+            space[name] = [ast.literal_eval(value) for value in values.split(",")]
+        RunConfig(**{name: space[name][0]})  # raises for unknown settings
+    return space
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Robo Showdown hyperparameter sweep")
+    parser.add_argument("space", nargs="+", metavar="NAME=VALUES",
+                        help="setting and its values, e.g. POPULATION_SIZE=6,12 or with --random NAME=low:high")
+    parser.add_argument("--random", type=int, metavar="N", help="random search of N runs instead of a grid")
+    parser.add_argument("--generations", type=int, default=50, help="generations to train per run")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per configuration, with different seeds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first repeat and the random search")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--arenas", type=int, default=1, help="arenas the population is split into")
+    parser.add_argument("--trials", type=int, default=1, help="trials per arena with different seeds")
+    parser.add_argument("--output", metavar="FILE", help="also write the results as CSV to FILE")
+    args = parser.parse_args()
+
+    try:
+        args.space = parse_space(args.space, ranges=args.random is not None)
+    except (ValueError, SyntaxError, TypeError) as e:
+        parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configs = random_search(args.space, args.random, args.seed) if args.random else grid(args.space)
+
+    rows = []
+    for row in sweep(configs, args.generations, args.workers, args.seed, args.repeats, args.arenas, args.trials):
+        rows.append(row)
+        print("run %d/%d done in %.1fs" % (len(rows), len(configs) * args.repeats, row["seconds"]),
+              file=sys.stderr)
+
+    print(format_table(rows))
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(sorted(rows, key=lambda row: row["run"]))
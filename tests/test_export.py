@@ -0,0 +1,23 @@
+"""Tests of the export formats."""
+import numpy as np
+import pygame
+import pytest
+
+from export import GifWriter
+
+
+def test_gif_frames_last_one_frame_interval(tmp_path):
+    imageio = pytest.importorskip("imageio.v3")
+    path = str(tmp_path / "generation.gif")
+
+    writer = GifWriter(path, fps=10)
+    surface = pygame.Surface((16, 8))
+    for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255)):
+        surface.fill(color)
+        writer.write(surface)
+    writer.close()
+
+    frames = imageio.imread(path, index=None)
+    assert frames.shape[:3] == (3, 8, 16)
+    assert np.array_equal(frames[1, 0, 0, :3], [0, 255, 0])
+    assert imageio.immeta(path, index=0)["duration"] == 100  # milliseconds
@@ -0,0 +1,22 @@
+"""Tests of fighters created without their sprites."""
+import numpy as np
+
+from settings import FIGHTER_RADIUS, NUM_ACTIONS, NUM_STATES
+from colors import BLUE, RED
+from fighter import Fighter
+
+
+def test_sprites_are_created_at_the_current_position():
+    fighter = Fighter(id=0, color=BLUE, radius=FIGHTER_RADIUS, x=10, y=20, angle=90,
+                      Q=np.zeros((NUM_STATES, NUM_ACTIONS)))
+    fighter.set_position(100, 50)
+    fighter.rotate_by(90)
+    fighter.set_color(RED)
+    assert not fighter.has_sprites
+
+    assert fighter.torso.rect.topleft == (100, 50)
+    assert fighter.torso.color == RED
+    assert fighter.has_sprites
+    assert fighter.vision.start == fighter.get_center() == (100 + FIGHTER_RADIUS, 50 + FIGHTER_RADIUS)
+    # facing down, the weapon sits at the bottom of the torso
+    assert fighter.weapon.rect.centery > fighter.torso.rect.centery
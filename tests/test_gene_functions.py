@@ -0,0 +1,38 @@
+"""Tests of parent selection and breeding."""
+import numpy as np
+
+from settings import ACTION_MUTATION_AMOUNT, NUM_ACTIONS, NUM_ELITE, NUM_STATES, POPULATION_SIZE
+from gene_functions import breed_population, create_random_fighter, fitness, select_parents
+
+
+def test_select_parents_never_pairs_a_fighter_with_itself():
+    fitnesses = np.array([1, 5, 1, 20, 3])
+    parent1, parent2 = select_parents(fitnesses, 10000, np.random.default_rng(0))
+    assert np.all(parent1 != parent2)
+    assert np.bincount(parent1, minlength=5).argmax() == 3
+
+
+def test_select_parents_pairs_a_single_fighter_with_itself():
+    parent1, parent2 = select_parents(np.array([5]), 5, np.random.default_rng(0))
+    assert parent1.tolist() == parent2.tolist() == [0] * 5
+
+
+def test_breed_population_selects_parents_by_evaluated_fitness():
+    weights = [i / POPULATION_SIZE for i in range(POPULATION_SIZE)]
+
+    parent_weights = set()
+    for _ in range(20):
+        population = {i: create_random_fighter(i, Q=np.full((NUM_STATES, NUM_ACTIONS), weights[i]))
+                      for i in range(POPULATION_SIZE)}
+        for fighter in population.values():
+            fighter.hits = 1 + fighter.id  # the last NUM_ELITE fighters are the elite
+        new_population = breed_population(population)
+        assert {fitness(f) for f in list(new_population.values())[:NUM_ELITE]} == {1}  # reset
+        for child in list(new_population.values())[NUM_ELITE:]:
+            assert not child.has_sprites  # only created when drawn
+            # every row comes from an evaluated fighter, mutated by at most one step
+            for weight in (child.Q[0, 0], child.Q[-1, 0]):
+                parent_weights.add(min(weights, key=lambda w: abs(weight - w)))
+                assert min(abs(weight - w) for w in weights) <= ACTION_MUTATION_AMOUNT + 1e-9
+
+    assert len(parent_weights) > NUM_ELITE  # not only the elite are parents
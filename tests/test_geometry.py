@@ -0,0 +1,75 @@
+"""Tests of the analytic segment-circle intersection against the Bresenham pixel loop."""
+import numpy as np
+
+from geometry import angle_between, get_line, segment_intersects_circle, segments_intersect_circles
+
+
+NUM_RAYS = 20000
+
+# get_line points are up to half a pixel off the continuous segment, so the
+# two only disagree for segments passing within half a pixel of tangency
+TANGENCY_TOLERANCE = 0.5
+MAX_DISAGREEMENT = 0.005  # fraction of random rays
+
+
+def random_rays(seed=0, n=NUM_RAYS):
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, 400, (n, 2))
+    ends = rng.integers(0, 400, (n, 2))
+    centers = rng.integers(0, 400, (n, 2))
+    radii = rng.integers(5, 40, n)
+    return starts, ends, centers, radii
+
+
+def bresenham_hits(start, end, center, radius):
+    """The pixel loop segment_intersects_circle replaced."""
+    return any((x - center[0]) ** 2 + (y - center[1]) ** 2 < radius * radius
+               for x, y in get_line(start, end))
+
+
+def closest_distance(starts, ends, centers):
+    d = ends - starts
+    c = centers - starts
+    length_sq = (d ** 2).sum(axis=1)
+    t = np.clip((c * d).sum(axis=1) / np.where(length_sq == 0, 1, length_sq), 0, 1)
+    return np.sqrt(((d * t[:, None] - c) ** 2).sum(axis=1))
+
+
+def test_segment_intersects_circle_matches_bresenham():
+    starts, ends, centers, radii = random_rays()
+    rays = list(zip(map(tuple, starts.tolist()), map(tuple, ends.tolist()), centers.tolist(), radii.tolist()))
+    expected = np.array([bresenham_hits(*ray) for ray in rays])
+    hits = np.array([segment_intersects_circle(*ray) for ray in rays])
+
+    mismatched = hits != expected
+    assert mismatched.mean() <= MAX_DISAGREEMENT
+    distances = closest_distance(starts, ends, centers)
+    assert np.all(np.abs(distances[mismatched] - radii[mismatched]) <= TANGENCY_TOLERANCE)
+
+
+def test_segments_intersect_circles_matches_scalar():
+    starts, ends, centers, radii = random_rays(seed=1)
+    expected = [segment_intersects_circle(*ray) for ray in zip(starts.tolist(), ends.tolist(),
+                                                                 centers.tolist(), radii.tolist())]
+    assert segments_intersect_circles(starts, ends, centers, radii).tolist() == expected
+
+
+def test_segments_intersect_circles_broadcasts_pairs():
+    starts, ends, centers, radii = random_rays(seed=2, n=50)
+    hits = segments_intersect_circles(starts[:, None], ends[:, None], centers[None, :], radii[None, :])
+    assert hits.shape == (50, 50)
+    for i in range(50):
+        for j in range(50):
+            assert hits[i, j] == segment_intersects_circle(starts[i], ends[i], centers[j], radii[j])
+
+
+def test_degenerate_segment_is_a_point():
+    assert segment_intersects_circle((10, 10), (10, 10), (12, 10), 3)
+    assert not segment_intersects_circle((10, 10), (10, 10), (14, 10), 3)
+
+
+def test_angle_between_keeps_the_original_seam_normalization():
+    # rays and targets on either side of the negative x axis, where atan2 wraps:
+    # differences below -180 degrees are wrapped, ones above 180 are not
+    assert abs(angle_between((0, 0), (-10, 1), (-10, -1)) - 11.42) < 0.01
+    assert abs(angle_between((0, 0), (-10, -1), (-10, 1)) - 348.58) < 0.01
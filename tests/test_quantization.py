@@ -0,0 +1,49 @@
+"""Tests of the precision of compact Q-table storage."""
+import numpy as np
+import pytest
+
+from settings import NUM_ACTIONS, NUM_STATES
+from quantization import Q_DTYPES, dequantize, quantization_error, quantize
+from sparse_q import SparseQ
+
+
+def random_table(seed=0):
+    Q = np.random.default_rng(seed).random((NUM_STATES, NUM_ACTIONS))
+    Q[:3] = [0.0], [0.5], [1.0]  # edge values
+    return Q
+
+
+@pytest.mark.parametrize("dtype", Q_DTYPES)
+def test_round_trip_error_is_bounded(dtype):
+    Q = random_table()
+    stored = quantize(Q, dtype)
+    assert stored.dtype == np.dtype(dtype)
+    assert np.abs(dequantize(stored) - Q).max() <= quantization_error(dtype)
+
+
+@pytest.mark.parametrize("dtype", Q_DTYPES)
+def test_edge_values_round_trip(dtype):
+    edges = np.array([0.0, 0.5, 1.0])
+    restored = dequantize(quantize(edges, dtype))
+    assert restored[0] == 0 and restored[2] == 1
+    assert abs(restored[1] - 0.5) <= quantization_error(dtype)
+
+
+@pytest.mark.parametrize("dtype", Q_DTYPES)
+def test_quantize_matching_dtype_is_a_no_op(dtype):
+    stored = quantize(random_table(), dtype)
+    assert quantize(stored, dtype) is stored
+
+
+@pytest.mark.parametrize("dtype", Q_DTYPES)
+def test_sparse_tables_round_trip(dtype):
+    Q = random_table()
+    sparse = SparseQ.from_dense(Q, [0, 1, 2, 7, 4095])
+    stored = quantize(sparse, dtype)
+    assert isinstance(stored, SparseQ)
+    assert stored.dtype == np.dtype(dtype)
+    assert stored.rows.tolist() == sparse.rows.tolist()
+
+    restored = dequantize(stored)
+    assert isinstance(restored, SparseQ)
+    assert np.abs(np.asarray(restored) - np.asarray(sparse)).max() <= quantization_error(dtype)
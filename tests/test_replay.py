@@ -0,0 +1,41 @@
+"""Tests of reading replay files written by crashed or repeated runs."""
+import numpy as np
+
+from replay import MAGIC, ReplayFile, ReplayRecorder
+from world import World
+
+
+def record(path, generations, ticks=20):
+    recorder = ReplayRecorder(path)
+    for generation in generations:
+        world = World(np.random.default_rng(generation).random((4, 2)) * 300, np.zeros(4), reload_time=2)
+        recorder.begin(generation, world, [(255, 0, 0)] * 4)
+        for tick in range(ticks):
+            actions = np.ones((4, 4), dtype=bool)
+            world.step(actions, tick)
+            recorder.record(world, actions)
+        recorder.end()
+
+
+def test_truncated_chunk_is_skipped(tmp_path):
+    path = str(tmp_path / "replay.bin")
+    record(path, [0, 1])
+    with open(path, "rb") as f:
+        data = f.read()
+
+    chunk_size = (len(data) - len(MAGIC)) // 2
+    for cut in (1, 10, 30, chunk_size - 1):
+        with open(path, "wb") as f:
+            f.write(data[:len(MAGIC) + chunk_size + cut])
+        assert ReplayFile(path).generations == [0]
+
+
+def test_repeated_generations_keep_every_chunk(tmp_path):
+    path = str(tmp_path / "replay.bin")
+    record(path, [0, 1], ticks=20)
+    record(path, [0], ticks=30)  # a second session appending to the same file
+
+    replay = ReplayFile(path)
+    assert replay.generations == [0, 1]
+    assert [chunk.num_ticks for chunk in replay.chunks(0)] == [20, 30]
+    assert replay[0].num_ticks == 30
@@ -0,0 +1,99 @@
+"""Tests of sparse Q-tables, their breeding and storage."""
+import numpy as np
+
+from settings import ACTION_MUTATION_AMOUNT, NUM_ACTIONS, NUM_STATES
+from checkpoint import load_checkpoint, snapshot, write_checkpoint
+from gene_functions import breed_sparse_Q, create_random_fighter
+from model_store import load_model, save_model
+from sparse_q import SparseQ
+
+
+def random_sparse(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return SparseQ(np.sort(rows), rng.random((len(rows), NUM_ACTIONS)), rng.random(NUM_ACTIONS))
+
+
+def test_from_dense_keeps_rows_and_take_matches_dense():
+    Q = np.random.default_rng(0).random((NUM_STATES, NUM_ACTIONS))
+    sparse = SparseQ.from_dense(Q, [7, 3, 7, 4095])
+    assert sparse.rows.tolist() == [3, 7, 4095]
+    assert np.allclose(sparse.default, Q[[3, 7, 4095]].mean(axis=0))
+
+    states = np.array([[0, 3], [7, 4095], [4094, 8]])
+    taken = sparse.take(states)
+    assert taken.shape == (3, 2, NUM_ACTIONS)
+    assert np.array_equal(taken, np.asarray(sparse)[states])
+    assert np.array_equal(taken[0, 1], Q[3]) and np.array_equal(taken[0, 0], sparse.default)
+
+
+def test_breed_sparse_Q_crosses_over_the_parents_rows():
+    parent1 = create_random_fighter(0, Q=SparseQ([10, 20, 30], np.full((3, NUM_ACTIONS), 0.2), np.full(NUM_ACTIONS, 0.3)))
+    parent2 = create_random_fighter(1, Q=SparseQ([15], np.full((1, NUM_ACTIONS), 0.8), np.full(NUM_ACTIONS, 0.7)))
+    parent2.visits[[40, 4000]] = 1
+
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        child = breed_sparse_Q(parent1, parent2, rng)
+        assert child.rows.tolist() == [10, 15, 20, 30, 40, 4000]
+        assert np.all(np.abs(child.default - 0.3) <= ACTION_MUTATION_AMOUNT + 1e-9)  # parent 1's default
+
+        # rows before the crossover point come from parent 1, the rest from parent 2,
+        # parent 2 has no explicit rows 10, 20, 30 and gives its own default row for them
+        parent1_weights = parent1.Q.take(child.rows)
+        parent2_weights = parent2.Q.take(child.rows)
+        from_parent1 = np.all(np.abs(child.values - parent1_weights) <= ACTION_MUTATION_AMOUNT + 1e-9, axis=1)
+        from_parent2 = np.all(np.abs(child.values - parent2_weights) <= ACTION_MUTATION_AMOUNT + 1e-9, axis=1)
+        assert np.all(from_parent1 | from_parent2)
+        crossover = np.argmin(from_parent1) if not from_parent1.all() else len(from_parent1)
+        assert np.all(from_parent1[:crossover]) and np.all(from_parent2[crossover:])
+
+
+def test_sparse_model_round_trip(tmp_path):
+    Q = random_sparse([1, 5, 900])
+    path = str(tmp_path / "best_weights.npz")
+    save_model(Q, path)
+
+    loaded = load_model(path, csv_path=None)
+    assert isinstance(loaded, SparseQ)
+    assert loaded.rows.tolist() == [1, 5, 900]
+    assert np.array_equal(loaded.values, Q.values) and np.array_equal(loaded.default, Q.default)
+    assert loaded.num_states == NUM_STATES
+
+
+def test_checkpoint_stores_and_resumes_sparse_tables(tmp_path):
+    population = {0: create_random_fighter(0, Q=np.random.default_rng(0).random((NUM_STATES, NUM_ACTIONS))),
+                  1: create_random_fighter(1, Q=random_sparse([2, 3, 4000], seed=1)),
+                  2: create_random_fighter(2, Q=random_sparse([], seed=2))}
+    population[1].visits[[2, 3]] = 5
+    arrays = snapshot(7, population, [dict(generation=6)])
+
+    # sparse tables take no more room than their rows
+    assert arrays["Q"].shape == (1, NUM_STATES, NUM_ACTIONS)
+    assert arrays["sparse_rows"].tolist() == [2, 3, 4000]
+
+    path = str(tmp_path / "checkpoint.npz")
+    write_checkpoint(arrays, path)
+    generation, resumed, history = load_checkpoint(path)
+    assert generation == 7 and history == [dict(generation=6)]
+
+    assert np.array_equal(resumed[0].Q, population[0].Q)
+    for i in (1, 2):
+        Q, expected = resumed[i].Q, population[i].Q
+        assert isinstance(Q, SparseQ)
+        assert Q.rows.tolist() == expected.rows.tolist()
+        assert np.array_equal(Q.values, expected.values) and np.array_equal(Q.default, expected.default)
+    assert np.array_equal(resumed[1].visits, population[1].visits)
+    assert (resumed[2].x, resumed[2].y) == (population[2].x, population[2].y)
+
+
+def test_best_model_is_saved_sparse_and_loaded_from_the_last_saved_file(tmp_path, monkeypatch):
+    import model_store
+    monkeypatch.setattr(model_store, "MODEL_FILE", str(tmp_path / "best_weights.npy"))
+    monkeypatch.setattr(model_store, "SPARSE_MODEL_FILE", str(tmp_path / "best_weights.npz"))
+
+    save_model(np.zeros((NUM_STATES, NUM_ACTIONS)))
+    assert not isinstance(load_model(csv_path=None), SparseQ)
+
+    save_model(random_sparse([1, 2]))
+    assert (tmp_path / "best_weights.npz").exists()
+    assert isinstance(load_model(csv_path=None), SparseQ)
@@ -0,0 +1,82 @@
+"""Tests of the batched vision kernel against the per-pair Vision functions."""
+import numpy as np
+
+from settings import SIGHT_RANGE
+from geometry import angle_to_x_y, segment_intersects_circle
+from vision import detect_side, sense_pairs
+
+
+def random_pairs(seed=0, n=20000):
+    rng = np.random.default_rng(seed)
+    viewers = rng.integers(0, 400, (n, 2))
+    angles = rng.integers(0, 360, n)
+    # targets near the viewers, so many are in range
+    targets = viewers + rng.uniform(-1.5 * SIGHT_RANGE, 1.5 * SIGHT_RANGE, (n, 2))
+    radii = rng.integers(5, 20, n)
+    return viewers, angles, targets, radii
+
+
+def end_middle(center, angle):
+    """Middle vision ray end point, like Vision.update computes it."""
+    dx, dy = angle_to_x_y(angle, SIGHT_RANGE)
+    return int(center[0] + dx), int(center[1] + dy)
+
+
+def test_sense_pairs_matches_detect_side_and_on_target():
+    viewers, angles, targets, radii = random_pairs()
+    left, right, on_target = sense_pairs(viewers, angles, targets, radii)
+
+    for i, (center, angle, target, radius) in enumerate(zip(viewers.tolist(), angles.tolist(),
+                                                           targets.tolist(), radii.tolist())):
+        end = end_middle(center, angle)
+        side = detect_side(center, end, target)
+        assert (left[i], right[i]) == (side == "left", side == "right")
+        assert on_target[i] == segment_intersects_circle(center, end, target, radius)
+
+
+def test_sense_pairs_without_radii_skips_on_target():
+    viewers, angles, targets, _ = random_pairs(seed=1, n=10)
+    assert sense_pairs(viewers, angles, targets)[2] is None
+
+
+def test_vision_shows_the_whole_view_cone():
+    import pygame
+    from colors import GRAY, GREEN, RED, WHITE
+    from vision import Vision
+
+    rng = np.random.default_rng(2)
+    for center, angle in zip(rng.integers(-20, 420, (200, 2)).tolist(), rng.uniform(0, 360, 200).tolist()):
+        vision = Vision(0, tuple(center), angle, RED, GREEN, GRAY)
+        assert vision.rect.size == vision.source_rect.size
+        assert vision.rect.width * vision.rect.height < (2 * SIGHT_RANGE) ** 2 / 2
+
+        # drawing the sprite gives the pixels of drawing the rays directly, up to
+        # faint anti-aliasing lost to the colorkey, so no ray is clipped
+        drawn = pygame.Surface((600, 600))
+        drawn.fill(WHITE)
+        drawn.blit(vision.image, vision.rect.move(100, 100), vision.source_rect)
+        expected = pygame.Surface((600, 600))
+        expected.fill(WHITE)
+        for end, color in ((vision.end_left, RED), (vision.end_middle, GREEN), (vision.end_right, GRAY)):
+            pygame.draw.aaline(expected, pygame.Color(*color), (center[0] + 100, center[1] + 100),
+                               (end[0] + 100, end[1] + 100), 1)
+        difference = pygame.surfarray.array3d(drawn).astype(int) - pygame.surfarray.array3d(expected)
+        assert np.abs(difference).max() <= 2
+
+
+def test_sense_pairs_keeps_the_original_seam_normalization():
+    # a viewer facing left, middle ray slightly below (262 degrees) and above (278 degrees)
+    # the negative x axis, targets slightly above and below it
+    viewer = np.array([[200, 200]])
+    angles = np.array([262, 278])
+    targets = np.array([[100, 190], [100, 210]])
+    left, right, _ = sense_pairs(viewer, angles[:, None], targets[None, :])
+
+    # angle differences above 180 degrees are not wrapped, so the target
+    # below the axis is not seen by the ray above it
+    assert left.tolist() == [[False, False], [True, False]]
+    assert right.tolist() == [[True, True], [False, False]]
+    for i, angle in enumerate(angles):
+        for j, target in enumerate(targets):
+            side = detect_side(viewer[0], end_middle(viewer[0], angle), target)
+            assert (left[i, j], right[i, j]) == (side == "left", side == "right")
@@ -0,0 +1,64 @@
+"""Tests of the spatial grid pruning of World.sense and World.collide against all pairs."""
+import numpy as np
+
+from settings import BULLET_SPEED, FIGHTER_RADIUS, HEIGHT, NUM_ACTIONS, WIDTH
+from vision import sense_pairs
+from world import World
+
+
+def random_worlds(num_fighters, num_arenas, seed=0):
+    """Two identical worlds, the second with one grid cell per arena, so it tests all pairs."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(FIGHTER_RADIUS, [WIDTH - FIGHTER_RADIUS, HEIGHT - FIGHTER_RADIUS], (num_fighters, 2))
+    angles = rng.integers(0, 360, num_fighters)
+    worlds = [World(centers, angles, reload_time=2, num_arenas=num_arenas),
+              World(centers, angles, reload_time=2, num_arenas=num_arenas, cell_size=1e6)]
+
+    num_bullets = 4 * num_fighters
+    directions = np.radians(rng.uniform(0, 360, num_bullets))
+    bullets = (rng.uniform(0, WIDTH, num_bullets), rng.uniform(0, HEIGHT, num_bullets),
+               np.sin(directions) * BULLET_SPEED, -np.cos(directions) * BULLET_SPEED,
+               rng.integers(0, num_fighters, num_bullets))
+    for world in worlds:
+        world.add_bullets(*bullets)
+    return worlds, rng
+
+
+def all_pairs_fighter_observations(world):
+    """(left, right, on_target) of every fighter, testing every other fighter of its arena."""
+    centers = np.trunc(np.stack([world.x, world.y], axis=1))
+    same_arena = (world.arena[:, None] == world.arena[None, :]) & ~np.eye(world.num_fighters, dtype=bool)
+    left, right, on_target = sense_pairs(centers[:, None], world.angle[:, None], centers[None, :], world.radius)
+    return tuple((seen & same_arena).any(axis=1) for seen in (left, right, on_target))
+
+
+def assert_grid_matches_all_pairs(num_fighters, num_arenas, ticks=600, seed=0):
+    (world, reference), rng = random_worlds(num_fighters, num_arenas, seed)
+    for tick in range(ticks):
+        for w in (world, reference):
+            w.sense(tick)
+            w.collide()
+
+        for name in ("fighter_on_left", "fighter_on_right", "on_target", "bullet_on_left", "bullet_on_right",
+                     "hits", "damage"):
+            assert np.array_equal(getattr(world, name), getattr(reference, name)), (tick, name)
+        expected = all_pairs_fighter_observations(world)
+        assert np.array_equal(world.fighter_on_left, expected[0]), tick
+        assert np.array_equal(world.fighter_on_right, expected[1]), tick
+        assert np.array_equal(world.on_target, expected[2]), tick
+
+        actions = rng.random((num_fighters, NUM_ACTIONS)) < 0.5
+        for w in (world, reference):
+            w.step(actions, tick)
+
+    assert world.pairs_tested < reference.pairs_tested  # the grid did prune pairs
+    return world
+
+
+def test_grid_matches_all_pairs():
+    world = assert_grid_matches_all_pairs(40, 1)
+    assert world.hits.sum() > 0  # bullets did collide
+
+
+def test_grid_matches_all_pairs_in_many_arenas():
+    assert_grid_matches_all_pairs(40, 4, seed=1)
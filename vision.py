@@ -1,45 +1,89 @@
 """Representation of an entity's vision."""
 import pygame
+import numpy as np
 
 from colors import *
 from settings import *
 from geometry import *
+from math import ceil, floor
 from pygame import Color
 
 
-class Vision(pygame.sprite.Sprite):
+class Vision(pygame.sprite.DirtySprite):
 
     def __init__(self, viewer_id, center, angle, color_left, color_middle, color_right):
         """Initialize a new Vision sprite."""
         super().__init__()
 
         self.viewer_id = viewer_id
+        self.drawn = None
+        self.angle = None  # angle the shown part of the surface was sized for
 
+        # one surface for the rays at any angle, drawn from its center, only
+        # the part around the view cone (source_rect) is shown
+        self.half_size = ceil(SIGHT_RANGE) + 1
+        self.image = pygame.Surface([self.half_size * 2 + 1, self.half_size * 2 + 1])
+        self.image.set_colorkey(WHITE)
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.source_rect = pygame.Rect(0, 0, 0, 0)
+
+        self.update(center, angle, color_left, color_middle, color_right)
+
+    def resize(self, angle, *ray_offsets):
+        """Size the shown part of the surface to the view cone at angle.
+
+        ray_offsets are the exact (dx, dy) offsets of the ray end points from
+        the start at angle."""
+        self.angle = angle
+        xs, ys = zip(*ray_offsets)
+
+        # ends are truncated to pixels, so they lie up to a pixel either way of
+        # the exact offsets, plus a pixel around the anti-aliased rays
+        left = min(0, floor(min(xs))) - 1
+        top = min(0, floor(min(ys))) - 1
+        right = max(0, ceil(max(xs))) + 1
+        bottom = max(0, ceil(max(ys))) + 1
+
+        self.origin = (-left, -top)  # start of the rays in the shown part
+        self.source_rect.update(self.half_size + left, self.half_size + top, right - left + 1, bottom - top + 1)
+        self.rect.size = self.source_rect.size
+        self.drawn = None
+
+    def update(self, center, angle, color_left, color_middle, color_right):
+        """Move the vision rays and redraw them if anything changed."""
         # vision rays start from center
         self.start = self.center = center
 
         ldx, ldy = angle_to_x_y(angle - SIGHT_ANGLE, SIGHT_RANGE)
         mdx, mdy = angle_to_x_y(angle, SIGHT_RANGE)
         rdx, rdy = angle_to_x_y(angle + SIGHT_ANGLE, SIGHT_RANGE)
+        if angle != self.angle:
+            self.resize(angle, (ldx, ldy), (mdx, mdy), (rdx, rdy))
 
         # vision ray end points
         self.end_left = (int(self.start[0] + ldx), int(self.start[1] + ldy))
         self.end_middle = (int(self.start[0] + mdx), int(self.start[1] + mdy))
         self.end_right = (int(self.start[0] + rdx), int(self.start[1] + rdy))
 
-        # create a surface for the rays to be drawn on
-        self.image = pygame.Surface([WIDTH, HEIGHT])
-        self.image.fill(WHITE)
-        self.image.set_colorkey(WHITE)
+        rays = ((self.end_left, color_left), (self.end_middle, color_middle), (self.end_right, color_right))
+        if (self.start, rays) == self.drawn:
+            return
+        self.drawn = (self.start, rays)
+
+        self.rect.x = self.start[0] - self.origin[0]
+        self.rect.y = self.start[1] - self.origin[1]
+        self.image.fill(WHITE, self.source_rect)
 
-        pygame.draw.aaline(self.image, Color(*color_left), self.start, self.end_left, 1)
-        pygame.draw.aaline(self.image, Color(*color_middle), self.start, self.end_middle, 1)
-        pygame.draw.aaline(self.image, Color(*color_right), self.start, self.end_right, 1)
+        # draw rays relative to the surface
+        local_start = (self.half_size, self.half_size)
+        for end, color in rays:
+            local_end = (end[0] - self.start[0] + self.half_size, end[1] - self.start[1] + self.half_size)
+            pygame.draw.aaline(self.image, Color(*color), local_start, local_end, 1)
 
-        self.rect = self.image.get_rect()
+        self.dirty = 1
 
     def draw(self, screen):
-        screen.blit(self.image, self.rect)
+        screen.blit(self.image, self.rect, self.source_rect)
 
     def detects(self, circle_sprite,
                 within_angle=SIGHT_ANGLE,
@@ -49,27 +93,59 @@ class Vision(pygame.sprite.Sprite):
         If detected, return the side it was detected on."""
         r = circle_sprite.radius
         obj_center = (circle_sprite.rect.x + r, circle_sprite.rect.y + r)
-
-        dist_to_obj_center = sqrt((self.center[0] - obj_center[0]) ** 2 +
-                                  (self.center[1] - obj_center[1]) ** 2)
-
-        if dist_to_obj_center <= within_range:  # object is within range
-            angle = angle_between(self.center, self.end_middle, obj_center)
-            if -within_angle <= angle < 0:
-                return "left"
-            elif 0 <= angle <= within_angle:
-                return "right"
-        return None
+        return detect_side(self.center, self.end_middle, obj_center, within_angle, within_range)
 
     def on_target(self, circle_sprite):
         """Return true if middle vision ray is pointed at circle sprite."""
         r = circle_sprite.radius
-        cx = circle_sprite.rect.x + r
-        cy = circle_sprite.rect.y + r
-
-        # see if any line point intersects with the circle sprite
-        for point in get_line(self.start, self.end_middle):
-            # pythagorean distance formula
-            if ((point[0] - cx) ** 2 + (point[1] - cy) ** 2) < (r * r):
-                return True
-        return False
+        center = (circle_sprite.rect.x + r, circle_sprite.rect.y + r)
+        return segment_intersects_circle(self.start, self.end_middle, center, r)
+
+
+def detect_side(center, end_middle, obj_center,
+                within_angle=SIGHT_ANGLE,
+                within_range=SIGHT_RANGE):
+    """Return the side ("left"/"right") obj_center is seen on, or None if not in view."""
+    dist_to_obj_center = sqrt((center[0] - obj_center[0]) ** 2 +
+                              (center[1] - obj_center[1]) ** 2)
+
+    if dist_to_obj_center <= within_range:  # object is within range
+        angle = angle_between(center, end_middle, obj_center)
+        if -within_angle <= angle < 0:
+            return "left"
+        elif 0 <= angle <= within_angle:
+            return "right"
+    return None
+
+
+def sense_pairs(viewer_centers, viewer_angles, target_centers, target_radii=None,
+                within_angle=SIGHT_ANGLE,
+                within_range=SIGHT_RANGE):
+    """Vectorized detect_side/Vision.on_target.
+
+    Centers have a last axis of size 2, the leading axes of all arguments are
+    broadcast against each other. Returns (left, right, on_target) boolean
+    arrays with the same pixel semantics as a Vision sprite. on_target is only
+    computed when target_radii are given, otherwise it is None."""
+    viewer_centers = np.trunc(np.asarray(viewer_centers, dtype=float))
+    target_centers = np.asarray(target_centers, dtype=float)
+    angles = np.radians(np.asarray(viewer_angles, dtype=float))
+
+    # middle vision ray end points, truncated to pixels like Vision does
+    ends = np.trunc(viewer_centers + within_range * np.stack([np.sin(angles), -np.cos(angles)], axis=-1))
+
+    u = ends - viewer_centers
+    v = target_centers - viewer_centers
+
+    in_range = (v ** 2).sum(axis=-1) <= within_range ** 2
+    angle = np.degrees(np.arctan2(v[..., 1], v[..., 0]) - np.arctan2(u[..., 1], u[..., 0]))
+    angle = np.where(angle < -180, angle % 360, angle)  # normalized like angle_between
+
+    left = in_range & (-within_angle <= angle) & (angle < 0)
+    right = in_range & (0 <= angle) & (angle <= within_angle)
+
+    on_target = None
+    if target_radii is not None:
+        on_target = segments_intersect_circles(viewer_centers, ends, target_centers, target_radii)
+
+    return left, right, on_target
@@ -0,0 +1,221 @@
+"""Struct-of-arrays simulation core for fighters and bullets."""
+import numpy as np
+
+from settings import *
+from bullet_pool import BulletPool
+from spatial import SpatialGrid
+from vision import sense_pairs
+
+
+class World:
+    """All fighters and bullets of one or more arenas, stored in contiguous arrays.
+
+    Every entity is advanced in one vectorized step, the sprite classes
+    (Fighter, Bullet) are only views of this state used for rendering.
+    Positions are the float centers of the torsos and bullets.
+
+    With num_arenas K, fighter arrays are flattened (K, N) arrays of N
+    fighters per arena (see per_arena). Arenas are independent matches
+    that share every step, entities of different arenas never interact."""
+
+    def __init__(self, centers, angles, radius=FIGHTER_RADIUS, bullet_radius=5,
+                 reload_time=TIME_TO_RELOAD, cell_size=SPATIAL_GRID_CELL_SIZE, num_arenas=1):
+        """Initialize a world with one fighter per center/angle, split evenly into arenas."""
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        self.num_fighters = n = len(centers)
+        self.index = np.arange(n)
+
+        if n % num_arenas:
+            raise ValueError("every arena needs the same number of fighters")
+        self.num_arenas = num_arenas
+        self.arena = self.index // (n // num_arenas)
+
+        self.radius = radius
+        self.weapon_radius = int(radius / 3)
+        self.bullet_radius = bullet_radius
+        self.reload_time = reload_time
+
+        # spatial grids, rebuilt every tick, prune pairs that are too far apart
+        self.fighter_grid = SpatialGrid(cell_size)
+        self.bullet_grid = SpatialGrid(cell_size)
+
+        # fighters
+        self.x = centers[:, 0].copy()
+        self.y = centers[:, 1].copy()
+        self.angle = np.asarray(angles, dtype=float) % 360
+        self.speed = np.full(n, FIGHTER_SPEED, dtype=float)
+        self.update_velocity()
+
+        self.reloading = np.zeros(n, dtype=bool)
+        self.last_shot_time = np.zeros(n)
+        self.hits = np.zeros(n, dtype=int)
+        self.damage = np.zeros(n, dtype=int)
+        self.state = np.zeros(n, dtype=int)
+        self.visits = np.zeros((n, NUM_STATES), dtype=np.int32)  # times each fighter acted in each state
+        self.pairs_tested = 0  # (fighter, fighter/bullet) pairs tested by sense and collide so far
+
+        # observations
+        self.bullet_on_left = np.zeros(n, dtype=bool)
+        self.bullet_on_right = np.zeros(n, dtype=bool)
+        self.fighter_on_left = np.zeros(n, dtype=bool)
+        self.fighter_on_right = np.zeros(n, dtype=bool)
+        self.on_target = np.zeros(n, dtype=bool)
+
+        # bullets, indexed by their slot in the pool
+        self.bullets = BulletPool(BULLETS_PER_FIGHTER * n)
+        self.spawned = np.empty(0, dtype=int)  # slots of the bullets spawned by the last step
+
+    @classmethod
+    def from_fighters(cls, fighters, **kwargs):
+        """Create a world from the current position/angle of fighters."""
+        fighters = list(fighters)
+        centers = [(f.x + f.radius, f.y + f.radius) for f in fighters]
+        angles = [f.angle for f in fighters]
+        return cls(centers, angles, **kwargs)
+
+    def store_results(self, fighters):
+        """Copy hits/damage back to the fighters they were simulated for and add up their state visits."""
+        for i, fighter in enumerate(fighters):
+            fighter.hits = int(self.hits[i])
+            fighter.damage = int(self.damage[i])
+            fighter.visits += self.visits[i]
+
+    @property
+    def num_bullets(self):
+        return len(self.bullets)
+
+    def per_arena(self, values):
+        """Return a (num_arenas, fighters per arena) view of a fighter array."""
+        return values.reshape(self.num_arenas, -1)
+
+    def update_velocity(self):
+        """Update unit and dx dy movement components from current angles."""
+        angle = np.radians(self.angle)
+
+        # times -1 for y because of pygame coordinates
+        self.unit_dx = np.sin(angle)
+        self.unit_dy = -np.cos(angle)
+        self.dx = self.unit_dx * self.speed
+        self.dy = self.unit_dy * self.speed
+
+    def get_state(self):
+        """Get current states based on observations and previous states."""
+        state = (self.fighter_on_left.astype(int) << 5) + (self.fighter_on_right.astype(int) << 4) + \
+                (self.bullet_on_left.astype(int) << 3) + (self.bullet_on_left.astype(int) << 2) + \
+                (self.reloading.astype(int) << 1) + (self.on_target.astype(int) << 0)  # arbitrary order
+        return state * self.state  # unique state based on previous state
+
+    def sense(self, clock_time):
+        """Update reload timers and what every fighter sees."""
+        self.reloading &= (clock_time - self.last_shot_time) <= self.reload_time
+
+        # fighters are seen at pixel centers, like their sprites
+        centers = np.trunc(np.stack([self.x, self.y], axis=1))
+        n = self.num_fighters
+
+        self.fighter_grid.build(centers[:, 0], centers[:, 1], self.arena)
+        viewers, targets = self.fighter_grid.query_pairs(centers[:, 0], centers[:, 1], self.arena)
+        others = viewers != targets
+        viewers, targets = viewers[others], targets[others]
+        self.pairs_tested += len(viewers)
+
+        left, right, on_target = sense_pairs(centers[viewers], self.angle[viewers],
+                                             centers[targets], self.radius)
+        self.fighter_on_left = np.bincount(viewers[left], minlength=n) > 0
+        self.fighter_on_right = np.bincount(viewers[right], minlength=n) > 0
+        self.on_target = np.bincount(viewers[on_target], minlength=n) > 0
+
+        viewers, bullets = self.bullet_pairs(centers)
+        self.pairs_tested += len(viewers)
+        bullet_centers = np.stack([self.bullets.x[bullets], self.bullets.y[bullets]], axis=1)
+
+        left, right, _ = sense_pairs(centers[viewers], self.angle[viewers], bullet_centers)
+        self.bullet_on_left = np.bincount(viewers[left], minlength=n) > 0
+        self.bullet_on_right = np.bincount(viewers[right], minlength=n) > 0
+
+    def bullet_pairs(self, centers):
+        """Return (fighter, bullet slot) index arrays of bullets near fighter centers,
+        excluding bullets shot by the fighter itself."""
+        live = self.bullets.live()
+        shooters = self.bullets.shooter[live]
+        self.bullet_grid.build(self.bullets.x[live], self.bullets.y[live], self.arena[shooters])
+        fighters, points = self.bullet_grid.query_pairs(centers[:, 0], centers[:, 1], self.arena)
+        not_own = shooters[points] != fighters
+        return fighters[not_own], live[points[not_own]]
+
+    def collide(self):
+        """Detect bullet collisions, count hits/damage and remove the bullets."""
+        if not self.num_bullets:
+            return
+
+        fighters, bullets = self.bullet_pairs(np.stack([self.x, self.y], axis=1))
+        self.pairs_tested += len(fighters)
+        dist_sq = (self.bullets.x[bullets] - self.x[fighters]) ** 2 + \
+                  (self.bullets.y[bullets] - self.y[fighters]) ** 2
+        hit = dist_sq <= (self.radius + self.bullet_radius) ** 2
+        fighters, bullets = fighters[hit], bullets[hit]
+
+        # a bullet only damages the first fighter it collides with
+        order = np.lexsort((fighters, bullets))
+        bullets, first = np.unique(bullets[order], return_index=True)
+        victims = fighters[order][first]
+
+        self.damage += np.bincount(victims, minlength=self.num_fighters)
+        self.hits += np.bincount(self.bullets.shooter[bullets], minlength=self.num_fighters)
+        self.bullets.release(bullets)
+
+    def step(self, actions, clock_time):
+        """Execute an (num_fighters, NUM_ACTIONS) array of actions and move every entity."""
+        actions = np.asarray(actions, dtype=bool).reshape(self.num_fighters, NUM_ACTIONS)
+        turn_left, turn_right, move_forward, shoot = actions.T
+        self.visits[self.index, self.state] += 1  # the states the actions were selected in
+
+        # turn
+        self.angle += (turn_right.astype(int) - turn_left.astype(int)) * TURNING_RATE
+        self.angle %= 360
+        self.update_velocity()
+
+        # move forward, cannot run out of bounds
+        new_x = self.x + self.dx
+        new_y = self.y + self.dy
+        move_x = move_forward & (new_x - self.radius >= 0) & (new_x + self.radius <= WIDTH)
+        move_y = move_forward & (new_y - self.radius >= 0) & (new_y + self.radius <= HEIGHT)
+        self.x = np.where(move_x, new_x, self.x)
+        self.y = np.where(move_y, new_y, self.y)
+
+        # shoot if not reloading
+        shoot = shoot & ~self.reloading
+        self.reloading |= shoot
+        self.last_shot_time[shoot] = clock_time
+
+        self.state = self.get_state()
+
+        # bullets shot this step start moving on the next step
+        self.move_bullets()
+        self.spawn_bullets(shoot)
+
+    def spawn_bullets(self, shooters):
+        """Spawn a bullet at the weapon of every shooter."""
+        shooters = np.flatnonzero(shooters)
+
+        # weapon sits on the inner radius of the torso
+        inner_radius = self.radius - self.weapon_radius
+        unit_dx = self.unit_dx[shooters]
+        unit_dy = self.unit_dy[shooters]
+
+        self.add_bullets(self.x[shooters] + unit_dx * inner_radius,
+                         self.y[shooters] + unit_dy * inner_radius,
+                         unit_dx * BULLET_SPEED, unit_dy * BULLET_SPEED, shooters)
+
+    def add_bullets(self, x, y, dx, dy, shooter):
+        """Add bullets at centers x, y moving by dx, dy per step."""
+        self.spawned = self.bullets.spawn(x, y, dx, dy, shooter)
+
+    def move_bullets(self):
+        """Move every bullet and remove the ones that left the screen."""
+        bullets = self.bullets
+        bullets.move()
+
+        r = self.bullet_radius
+        bullets.release_where((bullets.x + r < 0) | (bullets.x - r > WIDTH) |
+                              (bullets.y + r < 0) | (bullets.y - r > HEIGHT))